@@ -0,0 +1,97 @@
+"""
+Cart write throughput with and without group commit.
+
+Runs against a throwaway SQLite database:
+
+    python benchmarks/cart_writes.py [--clients 1,8,64] [--seconds 5]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+_workdir = tempfile.mkdtemp(prefix="cart-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'bench.db')}"
+os.environ["DATABASE_READ_URLS"] = ""
+os.environ["JOBS_IN_PROCESS_THREADS"] = "0"
+os.chdir(_workdir)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+
+from main import app  # noqa: E402
+from src.group_commit import group_commit  # noqa: E402
+from src.models import db, Category, Product, User  # noqa: E402
+
+
+def seed(clients):
+    with app.app_context():
+        category = Category(name="Bench")
+        db.session.add(category)
+        db.session.flush()
+        products = [
+            Product(name=f"P{i}", title=f"P{i}", price=1.0, category_id=category.id)
+            for i in range(20)
+        ]
+        users = [User(name=f"u{i}", email=f"u{i}@bench") for i in range(clients)]
+        for user in users:
+            user.password_hash = "x"
+        db.session.add_all(products + users)
+        db.session.commit()
+        tokens = [create_access_token(identity=str(u.id)) for u in users]
+        return tokens, [p.id for p in products]
+
+
+def run(clients, seconds, tokens, product_ids):
+    counts = [0] * clients
+    errors = [0] * clients
+    stop = time.monotonic() + seconds
+
+    def client(i):
+        http = app.test_client()
+        headers = {"Authorization": f"Bearer {tokens[i]}"}
+        n = 0
+        while time.monotonic() < stop:
+            with http.post(
+                "/cart/add",
+                json={"product_id": product_ids[n % len(product_ids)]},
+                headers=headers,
+            ) as response:
+                if response.status_code == 200:
+                    counts[i] += 1
+                else:
+                    errors[i] += 1
+            n += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    return sum(counts) / elapsed, sum(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", default="1,8,64")
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+    levels = [int(c) for c in args.clients.split(",")]
+
+    tokens, product_ids = seed(max(levels))
+    print(f"{'clients':>8} {'mode':>14} {'writes/s':>10} {'errors':>7}")
+    for clients in levels:
+        for enabled in (False, True):
+            group_commit.enabled = enabled
+            rate, errors = run(clients, args.seconds, tokens, product_ids)
+            mode = "group-commit" if enabled else "per-request"
+            print(f"{clients:>8} {mode:>14} {rate:>10.1f} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
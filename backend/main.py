@@ -1,11 +1,24 @@
 import os
-from flask import Flask, jsonify, request
-from flask_cors import CORS
+from flask import Flask, jsonify
 from flask_jwt_extended import JWTManager
+from werkzeug.middleware.proxy_fix import ProxyFix
+from src import cache, jobs, recommendations
+from src.cors import CORSMiddleware
+from src.db_routing import read_replicas, sqlite_read_only_uri
+from src.group_commit import group_commit
+from src.idempotency import idempotency_store
 from src.models import User, db
+from src.schema import upgrade_schema
+from src.snapshots import catalog_snapshots
+from src.suggest import suggest_index
+from src.profiling import request_profiler
+from src.ratelimit import ConcurrencyLimitMiddleware, rate_limiter
 from src.routes import (
     auth_bp,
     admin_bp,
+    catalog_bp,
+    media_bp,
+    page_bp,
     category_bp,
     product_bp,
     cart_bp,
@@ -14,51 +27,109 @@ from src.routes import (
 
 app = Flask(__name__)
 
-app.config["SQLALCHEMY_DATABASE_URI"] = (
-    f"sqlite:///{os.path.abspath('instance/ecom.db')}"
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get(
+    "DATABASE_URL", f"sqlite:///{os.path.abspath('instance/ecom.db')}"
 )
+# Comma-separated replica URIs. Locally GETs read the primary file through
+# read-only connections, which WAL mode lets run alongside the writer.
+app.config["SQLALCHEMY_READ_REPLICAS"] = os.environ.get(
+    "DATABASE_READ_URLS",
+    (
+        sqlite_read_only_uri(os.path.abspath("instance/ecom.db"))
+        if "DATABASE_URL" not in os.environ
+        else ""
+    ),
+).split(",")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["JWT_SECRET_KEY"] = "super-secret-key"
 app.config["JWT_TOKEN_LOCATION"] = ["headers"]
-
-CORS(
-    app,
-    origins=[
-        "http://localhost:3000",
-        "http://localhost:5173",
-        "http://localhost:5000",
-        "https://mini-cart-app.vercel.app",
+app.config["CORS_ORIGINS"] = [
+    origin.strip()
+    for origin in os.environ.get(
+        "CORS_ORIGINS",
+        "http://localhost:3000,"
+        "http://localhost:5173,"
+        "http://localhost:5000,"
+        "https://mini-cart-app.vercel.app,"
         "https://mini-cart-app.onrender.com",
-    ],
-    methods=["GET", "HEAD", "POST", "PUT", "DELETE", "OPTIONS"],
-    supports_credentials=True,
-    allow_headers=["Content-Type", "Authorization", "X-Login-Request"],
+    ).split(",")
+    if origin.strip()
+]
+app.config["CORS_ALLOW_HEADERS"] = [
+    "Content-Type",
+    "Authorization",
+    "X-Login-Request",
+    "Idempotency-Key",
+    "X-Profile",
+]
+app.config["CORS_EXPOSE_HEADERS"] = [
+    "Retry-After",
+    "Idempotent-Replayed",
+    "X-Profile-Id",
+]
+app.config["CORS_MAX_AGE"] = 24 * 60 * 60
+app.config["IDEMPOTENCY_KEY_TTL"] = 24 * 60 * 60
+# Set to a file path to share idempotency keys between gunicorn workers.
+app.config["IDEMPOTENCY_STORAGE"] = os.environ.get("IDEMPOTENCY_STORAGE")
+app.config["RATELIMIT_POLICIES"] = {
+    "auth": "10/minute",
+    "admin.admin_login": "10/minute",
+    "product": "20/second",
+    "page": "20/second",
+}
+# Set to a file path to share buckets between gunicorn workers.
+app.config["RATELIMIT_STORAGE"] = os.environ.get("RATELIMIT_STORAGE")
+# Proxies in front of the app whose X-Forwarded-* headers are trusted, so
+# rate limits see client addresses. Render adds one; none locally.
+app.config["TRUSTED_PROXY_HOPS"] = int(
+    os.environ.get("TRUSTED_PROXY_HOPS", 1 if "RENDER" in os.environ else 0)
+)
+# Open /admin/orders/stream connections per process. Each holds a gthread
+# worker thread for up to ORDER_STREAM_MAX_SECONDS, so they get threads of
+# their own rather than sharing the request limit below.
+app.config["ORDER_STREAM_MAX_CONNECTIONS"] = int(
+    os.environ.get("ORDER_STREAM_MAX_CONNECTIONS", 4)
+)
+# Shed load just before every gthread worker thread (WEB_THREADS, see the
+# Procfile) not reserved for streams is busy, instead of queueing behind them.
+app.config["MAX_CONCURRENT_REQUESTS"] = max(
+    1,
+    int(os.environ.get("WEB_THREADS", 16))
+    - app.config["ORDER_STREAM_MAX_CONNECTIONS"]
+    - 2,
+)
+app.config["MEDIA_ROOT"] = os.path.abspath("instance/media")
+app.config["MAX_IMAGE_BYTES"] = 10 * 1024 * 1024
+# Decoded size cap, at two pixels per allowed upload byte: more than any
+# photo that fits in MAX_IMAGE_BYTES, and at most 80 MB once decoded.
+app.config["MAX_IMAGE_PIXELS"] = app.config["MAX_IMAGE_BYTES"] * 2
+app.config["CATALOG_CACHE_TTL"] = 60
+app.config["ORDER_STREAM_MAX_SECONDS"] = 300
+app.config["ORDER_STREAM_TICKET_SECONDS"] = 60
+# GET /admin/dashboard serves job-computed stats, refreshed past this age.
+app.config["DASHBOARD_STATS_MAX_AGE"] = 300
+app.config["SNAPSHOT_DIR"] = os.path.abspath("instance/snapshots")
+app.config["SNAPSHOT_PAGES"] = 3
+# Rebuild the snapshot this long after the first catalog write of a burst.
+app.config["SNAPSHOT_DEBOUNCE_SECONDS"] = 30
+# Where clients fetch snapshot files; defaults to this API.
+app.config["SNAPSHOT_BASE_URL"] = os.environ.get("SNAPSHOT_BASE_URL")
+# How often each process checks for catalog commits made by other processes
+# and applies them to its in-memory suggest index.
+app.config["SUGGEST_REFRESH_SECONDS"] = 5
+# How stale the units-sold ranking of suggestions may get.
+app.config["SUGGEST_POPULARITY_SECONDS"] = 300
+app.config["PROFILE_DIR"] = os.path.abspath("instance/profiles")
+app.config["PROFILE_SAMPLE_RATE"] = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+app.config["PROFILE_MAX_BYTES"] = 50 * 1024 * 1024
+# Batch cart/order writes from concurrent requests into shared SQLite commits.
+app.config["GROUP_COMMIT_ENABLED"] = os.environ.get("GROUP_COMMIT") == "1"
+app.config["GROUP_COMMIT_WINDOW_MS"] = 2
+app.config["GROUP_COMMIT_TIMEOUT"] = 30
+# Background job threads per gunicorn worker; 0 leaves jobs to `flask worker`.
+app.config["JOBS_IN_PROCESS_THREADS"] = int(
+    os.environ.get("JOBS_IN_PROCESS_THREADS", 1)
 )
-
-
-@app.before_request
-def handle_preflight():
-    if request.method == "OPTIONS":
-        response = jsonify({"status": "ok"})
-        origin = request.headers.get("Origin", "")
-        allowed_origins = [
-            "http://localhost:3000",
-            "http://localhost:5173",
-            "http://localhost:5000",
-            "https://mini-cart-app.vercel.app",
-            "https://mini-cart-app.onrender.com",
-        ]
-        if origin in allowed_origins:
-            response.headers.add("Access-Control-Allow-Origin", origin)
-        response.headers.add(
-            "Access-Control-Allow-Headers", "Content-Type,Authorization,X-Login-Request"
-        )
-        response.headers.add(
-            "Access-Control-Allow-Methods", "GET,HEAD,POST,PUT,DELETE,OPTIONS"
-        )
-        response.headers.add("Access-Control-Allow-Credentials", "true")
-        return response, 200
-
 
 jwt = JWTManager(app)
 
@@ -80,9 +151,38 @@ def invalid_token_response(callback):
 
 
 db.init_app(app)
+read_replicas.init_app(app, db)
+idempotency_store.init_app(app)
+group_commit.init_app(app)
+rate_limiter.init_app(app)
+jobs.init_app(app)
+cache.init_app(app)
+recommendations.init_app(app)
+catalog_snapshots.init_app(app)
+request_profiler.init_app(app)
+if app.config["TRUSTED_PROXY_HOPS"]:
+    hops = app.config["TRUSTED_PROXY_HOPS"]
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+app.wsgi_app = ConcurrencyLimitMiddleware(
+    app.wsgi_app,
+    app.config["MAX_CONCURRENT_REQUESTS"],
+    streams={"/admin/orders/stream": app.config["ORDER_STREAM_MAX_CONNECTIONS"]},
+)
+# Outermost, so preflights and 503s from the concurrency limit get CORS too.
+app.wsgi_app = CORSMiddleware(
+    app.wsgi_app,
+    origins=app.config["CORS_ORIGINS"],
+    allow_headers=app.config["CORS_ALLOW_HEADERS"],
+    expose_headers=app.config["CORS_EXPOSE_HEADERS"],
+    max_age=app.config["CORS_MAX_AGE"],
+)
 
 with app.app_context():
     db.create_all()
+    upgrade_schema()
+    suggest_index.build()
+    if catalog_snapshots.current() is None:
+        jobs.schedule("build_catalog_snapshot")
     admin = db.session.execute(
         db.select(User).filter_by(email="admin@example.com")
     ).scalar_one_or_none()
@@ -94,6 +194,9 @@ with app.app_context():
 
 app.register_blueprint(auth_bp, url_prefix="/auth")
 app.register_blueprint(admin_bp, url_prefix="/admin")
+app.register_blueprint(catalog_bp, url_prefix="/catalog")
+app.register_blueprint(media_bp, url_prefix="/media")
+app.register_blueprint(page_bp, url_prefix="/pages")
 app.register_blueprint(category_bp, url_prefix="/categories")
 app.register_blueprint(product_bp, url_prefix="/products")
 app.register_blueprint(cart_bp, url_prefix="/cart")
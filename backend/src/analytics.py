@@ -0,0 +1,167 @@
+from datetime import timedelta
+
+import numpy as np
+from sqlalchemy import distinct, func, select
+
+from .cache import TTLCache
+from .models import db, Category, Order, OrderItem, Product
+
+GRANULARITIES = ("day", "week", "month")
+GROUP_BYS = ("period", "product", "category")
+REVENUE_STATUSES = ("confirmed", "shipped", "delivered")
+
+analytics_cache = TTLCache(ttl=300, max_entries=256)
+
+
+def _daily_rows(start, end, group_by, statuses):
+    """
+    One SQL aggregate per (day, product|category) over the range.
+
+    The database does the heavy lifting, so at most days x keys rows come
+    back, as plain tuples rather than ORM objects. Distinct order counts
+    add up across days because each order falls on exactly one day.
+    """
+    day = func.date(Order.created_at)
+    if group_by == "product":
+        key = OrderItem.product_id
+    elif group_by == "category":
+        key = Product.category_id
+    else:
+        key = None
+
+    columns = [
+        day,
+        func.sum(OrderItem.price * OrderItem.quantity),
+        func.sum(OrderItem.quantity),
+        func.count(distinct(Order.id)),
+    ]
+    group = [day]
+    if key is not None:
+        columns.insert(1, key)
+        group.append(key)
+    query = (
+        select(*columns)
+        .select_from(Order)
+        .join(OrderItem, OrderItem.order_id == Order.id)
+        .where(
+            Order.created_at >= start,
+            Order.created_at < end + timedelta(days=1),
+            Order.status.in_(statuses),
+        )
+        .group_by(*group)
+    )
+    if group_by == "category":
+        query = query.join(Product, Product.id == OrderItem.product_id)
+    return db.session.execute(query).all()
+
+
+def _bucket(days, granularity):
+    if granularity == "month":
+        return days.astype("datetime64[M]").astype("datetime64[D]")
+    if granularity == "week":
+        # Day 0 of the epoch was a Thursday; shift so weeks start on Monday.
+        offset = (days.astype(np.int64) + 3) % 7
+        return days - offset.astype("timedelta64[D]")
+    return days
+
+
+def sales_report(start, end, granularity="day", group_by="period", statuses=None):
+    """
+    Revenue, units and average order value for an inclusive date range.
+
+    Grouped by product or category, a row's revenue is only that group's
+    share of each order, so it reports revenue_per_order instead of
+    average_order_value.
+    """
+    statuses = tuple(sorted(statuses or REVENUE_STATUSES))
+    cache_key = (start, end, granularity, group_by, statuses)
+    cached = analytics_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    rows = _daily_rows(start, end, group_by, statuses)
+    if rows:
+        columns = list(zip(*rows))
+        days = np.array(columns[0], dtype="datetime64[D]")
+        if group_by == "period":
+            keys = np.zeros(len(rows), dtype=np.int64)
+            revenue, units, orders = columns[1:]
+        else:
+            keys = np.array(columns[1], dtype=np.int64)
+            revenue, units, orders = columns[2:]
+        revenue = np.array(revenue, dtype=np.float64)
+        units = np.array(units, dtype=np.int64)
+        orders = np.array(orders, dtype=np.int64)
+    else:
+        days = np.array([], dtype="datetime64[D]")
+        keys = np.array([], dtype=np.int64)
+        revenue = np.array([], dtype=np.float64)
+        units = np.array([], dtype=np.int64)
+        orders = np.array([], dtype=np.int64)
+
+    periods = _bucket(days, granularity)
+    combined = np.rec.fromarrays([periods, keys], names="period,key")
+    groups, inverse = np.unique(combined, return_inverse=True)
+    inverse = inverse.ravel()
+    group_revenue = np.bincount(inverse, weights=revenue, minlength=len(groups))
+    group_units = np.bincount(inverse, weights=units, minlength=len(groups))
+    group_orders = np.bincount(inverse, weights=orders, minlength=len(groups))
+
+    names = _names(group_by, np.unique(keys).tolist())
+    per_order = "average_order_value" if group_by == "period" else "revenue_per_order"
+    results = []
+    for i, group in enumerate(groups):
+        row = {
+            "period": str(group["period"]),
+            "revenue": round(float(group_revenue[i]), 2),
+            "units": int(group_units[i]),
+            "orders": int(group_orders[i]),
+            per_order: (
+                round(float(group_revenue[i] / group_orders[i]), 2)
+                if group_orders[i]
+                else 0
+            ),
+        }
+        if group_by != "period":
+            key = int(group["key"])
+            row[f"{group_by}_id"] = key
+            row[f"{group_by}_name"] = names.get(key)
+        results.append(row)
+
+    total_orders = int(orders.sum()) if group_by == "period" else None
+    report = {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "granularity": granularity,
+        "group_by": group_by,
+        "statuses": list(statuses),
+        "totals": {
+            "revenue": round(float(revenue.sum()), 2),
+            "units": int(units.sum()),
+        },
+        "rows": results,
+    }
+    if total_orders is not None:
+        report["totals"]["orders"] = total_orders
+        report["totals"]["average_order_value"] = (
+            round(float(revenue.sum()) / total_orders, 2) if total_orders else 0
+        )
+    analytics_cache.set(cache_key, report)
+    return report
+
+
+def _names(group_by, ids):
+    if group_by == "product":
+        model = Product
+    elif group_by == "category":
+        model = Category
+    else:
+        return {}
+    names = {}
+    for i in range(0, len(ids), 900):
+        names.update(
+            db.session.execute(
+                select(model.id, model.name).where(model.id.in_(ids[i : i + 900]))
+            ).all()
+        )
+    return names
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+
+from blinker import Namespace
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .models import Category, Product
+
+_signals = Namespace()
+
+# Sent after a commit that created, changed or deleted catalog rows, with
+# keyword arguments products, categories and deleted_products (sets of ids).
+catalog_changed = _signals.signal("catalog-changed")
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache whose entries expire after `ttl` seconds.
+
+    Caches are per process, so the TTL bounds how long another gunicorn
+    worker can serve data that was changed elsewhere.
+    """
+
+    def __init__(self, ttl=60, max_entries=5000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def get_many(self, keys):
+        """Return {key: value} for the keys that are cached."""
+        found = {}
+        for key in keys:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                found[key] = value
+        return found
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_MISSING = object()
+
+catalog_cache = TTLCache()
+
+
+def init_app(app):
+    catalog_cache.ttl = app.config.get("CATALOG_CACHE_TTL", catalog_cache.ttl)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_catalog_writes(session, flush_context):
+    changes = session.info.setdefault(
+        "catalog_changes",
+        {"products": set(), "categories": set(), "deleted_products": set()},
+    )
+    for obj in chain(session.new, session.dirty):
+        if isinstance(obj, Product):
+            changes["products"].add(obj.id)
+        elif isinstance(obj, Category):
+            changes["categories"].add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Product):
+            changes["deleted_products"].add(obj.id)
+        elif isinstance(obj, Category):
+            changes["categories"].add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_catalog_writes(session):
+    changes = session.info.pop("catalog_changes", None)
+    if changes and any(changes.values()):
+        catalog_cache.clear()
+        catalog_changed.send(session, **changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_catalog_writes(session):
+    session.info.pop("catalog_changes", None)
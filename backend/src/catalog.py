@@ -0,0 +1,203 @@
+from itertools import chain
+from math import ceil
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+
+from .fields import Projection, column, computed
+from .images import DETAIL_WIDTH, LIST_WIDTH, thumbnail_url
+from .models import db, CatalogSequence, CatalogTombstone, Category, Product
+
+# Payloads for the public catalog views. The API routes and the static
+# snapshot both build from these, so a snapshot file is exactly what the
+# matching request would return.
+
+PRODUCT_FIELDS = Projection(
+    {
+        "id": column(Product.id),
+        "name": column(Product.name),
+        "title": column(Product.title),
+        "description": column(Product.description),
+        "price": column(Product.price),
+        "image": column(Product.image),
+        "thumbnail": computed([Product.image], lambda p: thumbnail_url(p.image)),
+        "category_id": column(Product.category_id),
+        "rating": column(Product.rating),
+        # Hardcoded stock: 5-24 items
+        "stock_quantity": computed([Product.id], lambda p: (p.id * 7) % 20 + 5),
+    },
+    compact=["id", "name", "price", "thumbnail", "category_id", "rating"],
+)
+
+CATEGORY_FIELDS = Projection(
+    {
+        "id": column(Category.id),
+        "name": column(Category.name),
+        "description": column(Category.description),
+        "image": column(Category.image),
+        "thumbnail": computed(
+            [Category.image], lambda c: thumbnail_url(c.image, LIST_WIDTH)
+        ),
+    },
+    compact=["id", "name", "thumbnail"],
+)
+
+
+def categories_payload(fields=None):
+    """Body of GET /categories, limited to `fields` if given."""
+    fields = fields or list(CATEGORY_FIELDS.fields)
+    rows = db.session.execute(select(*CATEGORY_FIELDS.columns(fields))).all()
+    return {"categories": [CATEGORY_FIELDS.serialize(r, fields) for r in rows]}
+
+
+def category_payload(category):
+    """Body of GET /categories/<id>."""
+    return {
+        "id": category.id,
+        "name": category.name,
+        "description": category.description,
+        "image": category.image,
+        "thumbnail": thumbnail_url(category.image, DETAIL_WIDTH),
+    }
+
+
+def serialize_product_summary(product):
+    """A product as it appears in list views."""
+    return PRODUCT_FIELDS.serialize(product)
+
+
+def products_page_payload(
+    page=1, per_page=10, category_id=None, search=None, fields=None
+):
+    """Body of GET /products for the given page and filters."""
+    fields = fields or list(PRODUCT_FIELDS.fields)
+    filters = []
+
+    if category_id:
+        filters.append(Product.category_id == category_id)
+
+    if search:
+        search_term = f"%{search}%"
+        filters.append(
+            (Product.name.ilike(search_term)) | (Product.title.ilike(search_term))
+        )
+
+    # Paginated like Model.query.paginate(error_out=False), but over plain
+    # column rows, so only the requested columns are read or allocated.
+    per_page = per_page if per_page > 0 else 20
+    total = db.session.execute(
+        select(func.count()).select_from(Product).where(*filters)
+    ).scalar()
+    rows = db.session.execute(
+        select(*PRODUCT_FIELDS.columns(fields))
+        .where(*filters)
+        .limit(per_page)
+        .offset((max(page, 1) - 1) * per_page)
+    ).all()
+
+    return {
+        "products": [PRODUCT_FIELDS.serialize(r, fields) for r in rows],
+        "total": total,
+        "pages": ceil(total / per_page),
+        "current_page": page,
+    }
+
+
+def catalog_changes(since=0, limit=100):
+    """
+    Products and categories changed or deleted after change token `since`.
+
+    Returns (changes, next_token, has_more). Changes are in change order;
+    passing next_token back as `since` continues where this batch ended.
+    A row changed several times appears once, at its latest change.
+    """
+    products = (
+        Product.query.filter(Product.change_seq > since)
+        .order_by(Product.change_seq)
+        .limit(limit + 1)
+        .all()
+    )
+    categories = (
+        Category.query.filter(Category.change_seq > since)
+        .order_by(Category.change_seq)
+        .limit(limit + 1)
+        .all()
+    )
+    tombstones = (
+        CatalogTombstone.query.filter(CatalogTombstone.change_seq > since)
+        .order_by(CatalogTombstone.change_seq)
+        .limit(limit + 1)
+        .all()
+    )
+    changes = sorted(
+        chain(
+            (_upsert("product", p, serialize_product_summary(p)) for p in products),
+            (_upsert("category", c, category_payload(c)) for c in categories),
+            (
+                {
+                    "seq": t.change_seq,
+                    "type": t.kind,
+                    "id": t.entity_id,
+                    "op": "delete",
+                    "deleted_at": t.deleted_at.isoformat(),
+                }
+                for t in tombstones
+            ),
+        ),
+        key=lambda change: change["seq"],
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    next_token = changes[-1]["seq"] if changes else since
+    return changes, next_token, has_more
+
+
+def _upsert(kind, row, data):
+    return {
+        "seq": row.change_seq,
+        "type": kind,
+        "id": row.id,
+        "op": "upsert",
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+        "data": data,
+    }
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_catalog_changes(session, flush_context, instances):
+    changed = [
+        obj
+        for obj in chain(session.new, session.dirty)
+        if isinstance(obj, (Product, Category))
+        and session.is_modified(obj, include_collections=False)
+    ]
+    deleted = [obj for obj in session.deleted if isinstance(obj, (Product, Category))]
+    if not changed and not deleted:
+        return
+    seq = _reserve_change_seqs(session, len(changed) + len(deleted))
+    for obj in changed:
+        seq += 1
+        obj.change_seq = seq
+    for obj in deleted:
+        seq += 1
+        session.add(
+            CatalogTombstone(
+                kind="product" if isinstance(obj, Product) else "category",
+                entity_id=obj.id,
+                change_seq=seq,
+            )
+        )
+
+
+def _reserve_change_seqs(session, count):
+    """Claim `count` sequence numbers; returns the one before the first."""
+    conn = session.connection()
+    conn.execute(
+        update(CatalogSequence)
+        .where(CatalogSequence.id == 1)
+        .values(value=CatalogSequence.value + count)
+    )
+    value = conn.execute(
+        select(CatalogSequence.value).where(CatalogSequence.id == 1)
+    ).scalar_one()
+    return value - count
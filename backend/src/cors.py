@@ -0,0 +1,86 @@
+_PREFLIGHT_BODY = b'{"status": "ok"}\n'
+
+
+class CORSMiddleware:
+    """
+    WSGI middleware that handles CORS in front of Flask.
+
+    Preflight (OPTIONS) requests are answered here from header lists built
+    once at startup, so they never reach routing, the app context or any
+    before_request hook. Other requests from an allowed origin get the CORS
+    headers appended to whatever the app returns. Every response carries
+    Vary: Origin, so a shared cache never serves a copy made for one origin
+    (or for none) to another.
+    """
+
+    def __init__(
+        self,
+        wsgi_app,
+        origins,
+        methods=("GET", "HEAD", "POST", "PUT", "DELETE", "OPTIONS"),
+        allow_headers=("Content-Type", "Authorization"),
+        expose_headers=(),
+        supports_credentials=True,
+        max_age=86400,
+    ):
+        self.wsgi_app = wsgi_app
+        self.origins = frozenset(origins)
+
+        common = [("Vary", "Origin")]
+        if supports_credentials:
+            common.append(("Access-Control-Allow-Credentials", "true"))
+
+        preflight = common + [
+            ("Access-Control-Allow-Methods", ",".join(methods)),
+            ("Access-Control-Allow-Headers", ",".join(allow_headers)),
+            ("Access-Control-Max-Age", str(max_age)),
+        ]
+        body_headers = [
+            ("Content-Type", "application/json"),
+            ("Content-Length", str(len(_PREFLIGHT_BODY))),
+        ]
+        self._preflight = {
+            origin: body_headers + [("Access-Control-Allow-Origin", origin)] + preflight
+            for origin in self.origins
+        }
+        self._preflight_denied = body_headers + [("Vary", "Origin")]
+
+        actual = list(common)
+        if expose_headers:
+            actual.append(("Access-Control-Expose-Headers", ",".join(expose_headers)))
+        self._actual = {
+            origin: [("Access-Control-Allow-Origin", origin)] + actual
+            for origin in self.origins
+        }
+        self._actual_denied = [("Vary", "Origin")]
+
+    def __call__(self, environ, start_response):
+        origin = environ.get("HTTP_ORIGIN")
+
+        if environ["REQUEST_METHOD"] == "OPTIONS":
+            # list() so the server can't mutate the shared precomputed list.
+            start_response(
+                "200 OK", list(self._preflight.get(origin, self._preflight_denied))
+            )
+            return [_PREFLIGHT_BODY]
+
+        # Same-origin and unknown-origin responses still vary on Origin:
+        # long-lived public files (/media, snapshots) would otherwise be
+        # cached by a CDN without CORS headers for the SPA's origin.
+        cors_headers = self._actual.get(origin, self._actual_denied)
+
+        def start_with_cors(status, headers, exc_info=None):
+            vary = [v for k, v in headers if k.lower() == "vary"]
+            if vary:
+                # Fold any Vary the app set into the single Vary we send.
+                headers = [(k, v) for k, v in headers if k.lower() != "vary"]
+                names = [n.strip() for v in vary for n in v.split(",") if n.strip()]
+                if "origin" not in (n.lower() for n in names):
+                    names.append("Origin")
+                merged = ", ".join(names)
+                headers += [(k, merged if k == "Vary" else v) for k, v in cors_headers]
+            else:
+                headers = headers + cors_headers
+            return start_response(status, headers, exc_info)
+
+        return self.wsgi_app(environ, start_with_cors)
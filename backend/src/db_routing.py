@@ -0,0 +1,145 @@
+import itertools
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+
+_WRITE_METHODS = frozenset(["POST", "PUT", "PATCH", "DELETE"])
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to a replica engine while the request allows it.
+
+    A request is routed to a replica only when its policy says "read", the
+    session has nothing pending and has not flushed yet, and the current user
+    has not written recently (read-your-writes). Everything else, including
+    code running outside a request such as job workers, uses the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._reads_from_replica():
+            engine = read_replicas.pick()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self):
+        if not has_request_context() or g.get("db_role") != "read":
+            return False
+        if self._flushing or self.info.get("wrote"):
+            return False
+        if self.new or self.dirty or self.deleted:
+            return False
+        return not read_replicas.is_sticky(_identity())
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _pin_to_primary(session, flush_context):
+    session.info["wrote"] = True
+
+
+def _identity():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        # @jwt_required() has not run for this request.
+        return None
+
+
+def use_primary(view):
+    """Always run this view against the primary, even for GET."""
+    view.db_role = "write"
+    return view
+
+
+def use_replica(view):
+    """Allow this view to read from a replica, even for non-GET methods."""
+    view.db_role = "read"
+    return view
+
+
+class ReadReplicas:
+    """
+    Read engines for RoutingSession.
+
+    SQLALCHEMY_READ_REPLICAS lists the replica URIs. For SQLite, pointing a
+    read-only URI at the primary file (with the primary in WAL mode) gives
+    readers that never block the writer.
+    """
+
+    def __init__(self):
+        self._engines = []
+        self._cycle = None
+        self._lock = threading.Lock()
+        self._last_write = {}
+        self.sticky_seconds = 5
+
+    def init_app(self, app, db):
+        self.sticky_seconds = app.config.get(
+            "SQLALCHEMY_READ_STICKY_SECONDS", self.sticky_seconds
+        )
+        if app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+            with app.app_context():
+                event.listen(db.engine, "connect", _enable_wal)
+
+        uris = app.config.get("SQLALCHEMY_READ_REPLICAS") or []
+        self._engines = [create_engine(uri) for uri in uris if uri]
+        for engine in self._engines:
+            if engine.dialect.name == "sqlite":
+                event.listen(engine, "connect", _query_only)
+        self._cycle = itertools.cycle(self._engines) if self._engines else None
+
+        app.before_request(self._choose_role)
+        app.after_request(self._remember_write)
+
+    def pick(self):
+        if self._cycle is None:
+            return None
+        with self._lock:
+            return next(self._cycle)
+
+    def is_sticky(self, identity):
+        if identity is None:
+            return False
+        last = self._last_write.get(identity)
+        return last is not None and time.monotonic() - last < self.sticky_seconds
+
+    def _choose_role(self):
+        view = current_app.view_functions.get(request.endpoint)
+        role = getattr(view, "db_role", None)
+        if role is None:
+            role = "write" if request.method in _WRITE_METHODS else "read"
+        g.db_role = role
+
+    def _remember_write(self, response):
+        if request.method in _WRITE_METHODS and response.status_code < 400:
+            identity = _identity()
+            if identity is not None:
+                now = time.monotonic()
+                with self._lock:
+                    self._last_write[identity] = now
+                    if len(self._last_write) > 10000:
+                        cutoff = now - self.sticky_seconds
+                        self._last_write = {
+                            k: v for k, v in self._last_write.items() if v > cutoff
+                        }
+        return response
+
+
+def _enable_wal(dbapi_connection, connection_record):
+    dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+
+def _query_only(dbapi_connection, connection_record):
+    dbapi_connection.execute("PRAGMA query_only=ON")
+
+
+def sqlite_read_only_uri(path):
+    return f"sqlite:///file:{path}?mode=ro&uri=true"
+
+
+read_replicas = ReadReplicas()
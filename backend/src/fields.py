@@ -0,0 +1,57 @@
+COMPACT = "compact"
+
+
+def column(col):
+    """A field copied straight from one column (or labelled expression)."""
+    return (col,), lambda row: getattr(row, col.key)
+
+
+def computed(columns, fn):
+    """A field derived from one or more columns by fn(row)."""
+    return tuple(columns), fn
+
+
+class Projection:
+    """
+    The fields a list endpoint can return, and the columns each one needs.
+
+    Endpoints parse a `fields=` query parameter with parse(), select only
+    columns(names) and build each item with serialize(row, names), so a
+    request for a few fields never loads the others. Rows can be select()
+    rows or ORM objects, as long as they expose the columns by key.
+    """
+
+    def __init__(self, fields, compact):
+        self.fields = fields
+        self.compact = compact
+
+    def parse(self, raw):
+        """
+        Field names for a `fields=` value: every field when empty, the compact
+        set for "compact", else a comma-separated list. Raises ValueError
+        naming any unknown fields.
+        """
+        if not raw:
+            return list(self.fields)
+        if raw == COMPACT:
+            return list(self.compact)
+        names = list(dict.fromkeys(n.strip() for n in raw.split(",") if n.strip()))
+        if not names:
+            return list(self.fields)
+        unknown = [n for n in names if n not in self.fields]
+        if unknown:
+            raise ValueError(
+                f"Unknown fields: {', '.join(unknown)}. "
+                f"Choose from: {', '.join(self.fields)}, or {COMPACT}"
+            )
+        return names
+
+    def columns(self, names):
+        cols = {}
+        for name in names:
+            for col in self.fields[name][0]:
+                cols.setdefault(col.key, col)
+        return list(cols.values())
+
+    def serialize(self, row, names=None):
+        return {name: self.fields[name][1](row) for name in names or self.fields}
@@ -0,0 +1,138 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+from .models import db
+
+
+class GroupCommitWriter:
+    """
+    Run write operations, optionally batching them into shared commits.
+
+    An operation is a function that changes db.session and returns a
+    (body, status) pair without committing. It must validate before writing:
+    returning a status >= 400 means it changed nothing.
+
+    With GROUP_COMMIT_ENABLED, operations from every request thread in the
+    process go to one writer thread, which applies whatever arrives within
+    GROUP_COMMIT_WINDOW_MS in a single transaction, so one SQLite write lock
+    and fsync are shared by the whole batch. If that commit fails, the batch
+    is rolled back and replayed one operation per transaction, so each
+    request still gets its own result or error.
+
+    A request waits at most GROUP_COMMIT_TIMEOUT for the writer to pick up
+    its operation, then withdraws it and answers 503, which is safe to
+    retry because the operation never ran. Once the writer has started an
+    operation, the request waits for its real result.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.window = 0.002
+        self.max_batch = 64
+        self.timeout = 30
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get("GROUP_COMMIT_ENABLED", False)
+        self.window = app.config.get("GROUP_COMMIT_WINDOW_MS", 2) / 1000
+        self.max_batch = app.config.get("GROUP_COMMIT_MAX_BATCH", self.max_batch)
+        self.timeout = app.config.get("GROUP_COMMIT_TIMEOUT", self.timeout)
+
+    def run(self, op, *args):
+        if not self.enabled:
+            return _apply_alone(op, args)
+        self._ensure_thread()
+        future = Future()
+        self._queue.put((op, args, future))
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            if future.cancel():
+                # Never started, so it will never be applied: safe to retry.
+                self.app.logger.error("Group commit writer did not respond")
+                return {"message": "Server busy, please retry"}, 503
+        # Already being applied, so it may yet commit. Answering 503 now
+        # would invite a retry that applies it twice; wait for the outcome.
+        return future.result()
+
+    def _ensure_thread(self):
+        # Started lazily so each gunicorn worker gets its own writer.
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(
+                        target=self._loop, name="group-commit-writer", daemon=True
+                    )
+                    self._thread.start()
+
+    def _loop(self):
+        with self.app.app_context():
+            while True:
+                batch = [self._queue.get()]
+                deadline = time.monotonic() + self.window
+                while len(batch) < self.max_batch:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=timeout))
+                    except queue.Empty:
+                        break
+                # Requests that timed out have cancelled their operations.
+                batch = [
+                    item for item in batch if item[2].set_running_or_notify_cancel()
+                ]
+                if not batch:
+                    continue
+                try:
+                    self._apply_batch(batch)
+                except Exception as e:
+                    # Fail this batch, not the writer: later requests still
+                    # need it.
+                    self.app.logger.exception("Group commit batch failed")
+                    try:
+                        db.session.rollback()
+                    except Exception:
+                        pass
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+
+    def _apply_batch(self, batch):
+        results = []
+        try:
+            for op, args, _ in batch:
+                results.append(op(*args))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            for op, args, future in batch:
+                try:
+                    future.set_result(_apply_alone(op, args))
+                except Exception as e:
+                    future.set_exception(e)
+            return
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+def _apply_alone(op, args):
+    try:
+        body, status = op(*args)
+        if status < 400:
+            db.session.commit()
+        else:
+            db.session.rollback()
+        return body, status
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+group_commit = GroupCommitWriter()
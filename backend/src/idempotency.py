@@ -0,0 +1,298 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity
+
+
+class _Entry:
+    def __init__(self, fingerprint, expires_at, token=None):
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.token = token
+        self.done = threading.Event()
+        self.response = None  # (body, status, mimetype) once completed
+
+
+class MemoryBackend:
+    """Keys held in this process; a retry on another worker is not seen."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, key, fingerprint, ttl):
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry, False
+            entry = _Entry(fingerprint, now + ttl)
+            self._entries[key] = entry
+            return entry, True
+
+    def wait(self, key, entry, timeout):
+        return entry.done.wait(timeout)
+
+    def complete(self, key, entry, response):
+        entry.response = response
+        entry.done.set()
+
+    def release(self, key, entry):
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        entry.done.set()
+
+    def _evict(self, now):
+        # Entries share one TTL, so insertion order is also expiry order.
+        while self._entries:
+            entry = next(iter(self._entries.values()))
+            if entry.expires_at > now:
+                # Over capacity: drop the oldest completed entry, but never
+                # one that is still running.
+                if len(self._entries) < self.max_entries or not entry.done.is_set():
+                    break
+            self._entries.popitem(last=False)
+
+
+class SQLiteBackend:
+    """
+    Keys in a local SQLite file, shared by every worker process, so a retry
+    or a concurrent duplicate is recognised whichever worker it reaches.
+
+    A key whose owner has not finished within `lease` seconds (its process
+    died mid-request) can be claimed again.
+    """
+
+    _SWEEP_EVERY = 1000
+    _POLL_INTERVAL = 0.05
+
+    def __init__(self, path, lease):
+        self.path = path
+        self.lease = lease
+        self._local = threading.local()
+        self._calls = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS idempotency_keys "
+            "(key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, "
+            "token TEXT NOT NULL, claimed_at REAL NOT NULL, "
+            "expires_at REAL NOT NULL, body BLOB, status INTEGER, mimetype TEXT)"
+        )
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def claim(self, key, fingerprint, ttl):
+        conn = self._connection()
+        now = time.time()
+        self._calls += 1
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._calls % self._SWEEP_EVERY == 0:
+                conn.execute(
+                    "DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,)
+                )
+            row = conn.execute(
+                "SELECT fingerprint, token, claimed_at, expires_at, body, status, "
+                "mimetype FROM idempotency_keys WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is not None:
+                stored, token, claimed_at, expires_at, *response = row
+                finished = response[1] is not None
+                if expires_at > now and (finished or claimed_at > now - self.lease):
+                    conn.execute("COMMIT")
+                    entry = _Entry(stored, expires_at, token)
+                    if finished:
+                        entry.response = tuple(response)
+                    return entry, False
+            entry = _Entry(fingerprint, now + ttl, uuid.uuid4().hex)
+            conn.execute(
+                "INSERT OR REPLACE INTO idempotency_keys "
+                "(key, fingerprint, token, claimed_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, fingerprint, entry.token, now, entry.expires_at),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return entry, True
+
+    def wait(self, key, entry, timeout):
+        if entry.response is not None:
+            return True
+        conn = self._connection()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            row = conn.execute(
+                "SELECT body, status, mimetype FROM idempotency_keys "
+                "WHERE key = ? AND token = ?",
+                (key, entry.token),
+            ).fetchone()
+            if row is None:
+                # Released: the original request failed.
+                return True
+            if row[1] is not None:
+                entry.response = tuple(row)
+                return True
+            time.sleep(self._POLL_INTERVAL)
+        return False
+
+    def complete(self, key, entry, response):
+        entry.response = response
+        self._connection().execute(
+            "UPDATE idempotency_keys SET body = ?, status = ?, mimetype = ? "
+            "WHERE key = ? AND token = ?",
+            (*response, key, entry.token),
+        )
+
+    def release(self, key, entry):
+        self._connection().execute(
+            "DELETE FROM idempotency_keys WHERE key = ? AND token = ?",
+            (key, entry.token),
+        )
+
+
+class IdempotencyStore:
+    """
+    TTL-bounded store of Idempotency-Key results.
+
+    The first request for a key executes the view; concurrent duplicates wait
+    for it to finish and every later replay gets the stored response back
+    without running the view again. Keys live in this process unless
+    IDEMPOTENCY_STORAGE names a SQLite file, which every gunicorn worker
+    shares; with more than one worker, set it.
+    """
+
+    def __init__(self, ttl=24 * 60 * 60, max_entries=10000, wait_timeout=30):
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.backend = MemoryBackend(max_entries)
+
+    def init_app(self, app):
+        self.ttl = app.config.get("IDEMPOTENCY_KEY_TTL", self.ttl)
+        self.wait_timeout = app.config.get(
+            "IDEMPOTENCY_WAIT_TIMEOUT", self.wait_timeout
+        )
+        storage = app.config.get("IDEMPOTENCY_STORAGE")
+        if storage:
+            self.backend = SQLiteBackend(
+                storage, app.config.get("IDEMPOTENCY_LEASE_SECONDS", 300)
+            )
+        else:
+            self.backend = MemoryBackend(
+                app.config.get("IDEMPOTENCY_MAX_KEYS", self.backend.max_entries)
+            )
+
+    def claim(self, key, fingerprint):
+        """Return (entry, is_owner); the owner must complete or release it."""
+        return self.backend.claim(key, fingerprint, self.ttl)
+
+    def wait(self, key, entry):
+        """Wait for the owner to finish; False if it is still running."""
+        return self.backend.wait(key, entry, self.wait_timeout)
+
+    def complete(self, key, entry, response):
+        self.backend.complete(
+            key,
+            entry,
+            (response.get_data(), response.status_code, response.mimetype),
+        )
+
+    def release(self, key, entry):
+        """Forget an in-flight key so the client can retry it."""
+        self.backend.release(key, entry)
+
+
+idempotency_store = IdempotencyStore()
+
+
+def _fingerprint():
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(b"\0")
+    digest.update(request.path.encode())
+    digest.update(b"\0")
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _replay(entry):
+    body, status, mimetype = entry.response
+    response = Response(body, status=status, mimetype=mimetype)
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def idempotent(view):
+    """
+    Honour an optional Idempotency-Key header on a mutating endpoint.
+
+    Must be applied below @jwt_required() so keys are scoped per user.
+    Responses with a 5xx status are not stored, so the client may retry them.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > 255:
+            return jsonify({"message": "Idempotency-Key too long"}), 400
+
+        scoped_key = f"{get_jwt_identity()}:{request.path}:{key}"
+        fingerprint = _fingerprint()
+        entry, is_owner = idempotency_store.claim(scoped_key, fingerprint)
+
+        if entry.fingerprint != fingerprint:
+            return (
+                jsonify(
+                    {"message": "Idempotency-Key was used for a different request"}
+                ),
+                422,
+            )
+
+        if not is_owner:
+            if not idempotency_store.wait(scoped_key, entry):
+                return (
+                    jsonify({"message": "Request with this key is still in progress"}),
+                    409,
+                )
+            if entry.response is None:
+                return (
+                    jsonify({"message": "Original request failed, please retry"}),
+                    409,
+                )
+            return _replay(entry)
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            idempotency_store.release(scoped_key, entry)
+            raise
+
+        if response.status_code >= 500:
+            idempotency_store.release(scoped_key, entry)
+        else:
+            idempotency_store.complete(scoped_key, entry, response)
+        return response
+
+    return wrapper
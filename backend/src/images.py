@@ -0,0 +1,131 @@
+import hashlib
+import importlib.util
+import io
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+
+THUMBNAIL_WIDTHS = (160, 320, 640)
+THUMBNAIL_FORMATS = (("webp", "WEBP"), ("jpg", "JPEG"))
+
+# Thumbnail width per kind of view.
+LIST_WIDTH = 320
+DETAIL_WIDTH = 640
+LINE_ITEM_WIDTH = 160
+
+# Uploaded images are stored as <sha256>.<ext>, so any URL ending in that
+# shape is one of ours and has thumbnails next to it.
+_MANAGED_IMAGE = re.compile(r"^(?P<base>.*/)(?P<digest>[0-9a-f]{64})\.[a-z]+$")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class ImageError(Exception):
+    pass
+
+
+def pillow_available():
+    return importlib.util.find_spec("PIL") is not None
+
+
+def media_root():
+    return os.path.abspath(current_app.config.get("MEDIA_ROOT", "instance/media"))
+
+
+def _get_pool():
+    # Created lazily so each gunicorn worker gets its own pool after forking.
+    # Workers come from a forkserver rather than forking this process, which
+    # by now has request, job and writer threads that may hold locks.
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=current_app.config.get("IMAGE_WORKERS", 2),
+                    mp_context=multiprocessing.get_context("forkserver"),
+                )
+    return _pool
+
+
+def _write_atomic(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _render(data, digest, root, widths, max_pixels):
+    """Runs in a worker process: store the original and every thumbnail."""
+    from PIL import Image, UnidentifiedImageError
+
+    # Pillow only warns up to twice its limit; a small, highly compressed
+    # upload must not decode to hundreds of MB here.
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        image = Image.open(io.BytesIO(data))
+        if image.width * image.height > max_pixels:
+            raise ImageError("Image dimensions too large")
+        image.load()
+    except Image.DecompressionBombError as e:
+        raise ImageError("Image dimensions too large") from e
+    except (UnidentifiedImageError, OSError) as e:
+        raise ImageError("Unsupported image format") from e
+
+    ext = (image.format or "jpeg").lower().replace("jpeg", "jpg")
+    original = f"{digest}.{ext}"
+    os.makedirs(root, exist_ok=True)
+    if not os.path.exists(os.path.join(root, original)):
+        _write_atomic(os.path.join(root, original), data)
+
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+    for width in widths:
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+        else:
+            resized = image
+        for suffix, fmt in THUMBNAIL_FORMATS:
+            path = os.path.join(root, f"{digest}-{width}.{suffix}")
+            if os.path.exists(path):
+                continue
+            out = resized.convert("RGB") if fmt == "JPEG" else resized
+            buf = io.BytesIO()
+            out.save(buf, fmt, quality=82, optimize=True)
+            _write_atomic(path, buf.getvalue())
+    return original
+
+
+def store_image(data, base_url):
+    """
+    Store an uploaded image under its content hash and generate thumbnails.
+
+    Returns the public URL of the original; thumbnails are derived from it
+    with thumbnail_url(). Re-uploading the same bytes is a no-op.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    future = _get_pool().submit(
+        _render,
+        data,
+        digest,
+        media_root(),
+        THUMBNAIL_WIDTHS,
+        current_app.config.get("MAX_IMAGE_PIXELS", 20 * 1024 * 1024),
+    )
+    original = future.result(timeout=current_app.config.get("IMAGE_TIMEOUT", 30))
+    return base_url.rstrip("/") + "/" + original
+
+
+def thumbnail_url(image, width=LIST_WIDTH, fmt="webp"):
+    """URL of the thumbnail for an image, or the image itself if unmanaged."""
+    if not image:
+        return image
+    match = _MANAGED_IMAGE.match(image)
+    if not match:
+        return image
+    return f"{match['base']}{match['digest']}-{width}.{fmt}"
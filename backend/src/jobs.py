@@ -0,0 +1,315 @@
+import inspect
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta, timezone
+
+import click
+from sqlalchemy import insert, select, update
+
+from .models import db, Job
+
+_registry = {}
+_wakeup = threading.Event()
+
+
+def utcnow():
+    # Naive UTC, matching what SQLite's CURRENT_TIMESTAMP stores.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def job(kind, max_attempts=3):
+    """Register a function as a job; it is called as fn(ctx, **payload)."""
+
+    def decorator(fn):
+        _registry[kind] = (fn, max_attempts)
+        return fn
+
+    return decorator
+
+
+def enqueue(kind, delay=0, **payload):
+    """
+    Persist a new job and wake any in-process workers. Commits the session.
+
+    Raises KeyError for an unknown kind and TypeError if the payload does not
+    fit the job function's arguments, rather than failing in the worker.
+    """
+    if kind not in _registry:
+        raise KeyError(f"Unknown job kind: {kind}")
+    inspect.signature(_registry[kind][0]).bind(None, **payload)
+    record = Job(
+        kind=kind,
+        payload=json.dumps(payload),
+        max_attempts=_registry[kind][1],
+        run_after=utcnow() + timedelta(seconds=delay),
+    )
+    db.session.add(record)
+    db.session.commit()
+    _wakeup.set()
+    return record
+
+
+def schedule(kind, delay=0, **payload):
+    """
+    Enqueue a job unless one of the same kind is already waiting.
+
+    Runs on its own connection, so it is safe to call from session events
+    after commit. A burst of triggers inside `delay` seconds becomes one run.
+    Returns the new job's id, or None if one was already queued.
+    """
+    if kind not in _registry:
+        raise KeyError(f"Unknown job kind: {kind}")
+    with db.engine.begin() as conn:
+        waiting = conn.execute(
+            select(Job.id).where(Job.kind == kind, Job.status == "queued").limit(1)
+        ).first()
+        if waiting:
+            return None
+        job_id = conn.execute(
+            insert(Job).values(
+                kind=kind,
+                payload=json.dumps(payload),
+                max_attempts=_registry[kind][1],
+                run_after=utcnow() + timedelta(seconds=delay),
+            )
+        ).inserted_primary_key[0]
+    _wakeup.set()
+    return job_id
+
+
+def serialize_job(record):
+    return {
+        "id": record.id,
+        "kind": record.kind,
+        "status": record.status,
+        "progress": record.progress,
+        "attempts": record.attempts,
+        "max_attempts": record.max_attempts,
+        "result": json.loads(record.result) if record.result else None,
+        "error": record.error,
+        "created_at": record.created_at.isoformat() if record.created_at else None,
+        "finished_at": record.finished_at.isoformat() if record.finished_at else None,
+    }
+
+
+class JobContext:
+    def __init__(self, record):
+        self.job_id = record.id
+        self.attempt = record.attempts
+        # What the last attempt saved with set_progress(), so a retry can
+        # pick up after the work that was already committed.
+        self.checkpoint = json.loads(record.checkpoint) if record.checkpoint else None
+
+    def set_progress(self, fraction, checkpoint=None):
+        """
+        Record progress (0..1) and optionally a JSON-able checkpoint.
+
+        Commits the session, so call it between batches: the batch's writes
+        and the checkpoint describing them are committed together.
+        """
+        values = {"progress": fraction, "locked_at": utcnow()}
+        if checkpoint is not None:
+            values["checkpoint"] = json.dumps(checkpoint)
+        db.session.execute(update(Job).where(Job.id == self.job_id).values(**values))
+        db.session.commit()
+
+
+class JobWorker:
+    """
+    Pool of threads that claim and run queued jobs.
+
+    Claims are a conditional UPDATE, so any number of workers - threads in
+    gunicorn, `flask worker` processes, or both - can share one table.
+    Failed jobs are retried with exponential backoff until max_attempts;
+    jobs left "running" past the lease by a crashed worker are re-queued.
+    """
+
+    def __init__(self, app, threads=2):
+        self.app = app
+        self.threads = threads
+        self.poll_interval = app.config.get("JOBS_POLL_INTERVAL", 2.0)
+        self.lease = timedelta(seconds=app.config.get("JOBS_LEASE_SECONDS", 600))
+        self.backoff = app.config.get("JOBS_BACKOFF_SECONDS", 5)
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.threads):
+            name = f"{socket.gethostname()}:{os.getpid()}:{i}"
+            thread = threading.Thread(
+                target=self._loop, args=(name,), name=f"job-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        _wakeup.set()
+        for thread in self._threads:
+            thread.join()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _loop(self, name):
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    ran = self.run_once(name)
+                except Exception:
+                    self.app.logger.exception("Job worker error")
+                    db.session.rollback()
+                    ran = False
+            if not ran:
+                _wakeup.wait(self.poll_interval)
+                _wakeup.clear()
+
+    def run_once(self, name):
+        record = self._claim(name)
+        if record is None:
+            return False
+        fn, _ = _registry.get(record.kind, (None, None))
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat,
+            args=(record.id, name, done),
+            name=f"job-heartbeat-{record.id}",
+            daemon=True,
+        )
+        heartbeat.start()
+        try:
+            if fn is None:
+                raise KeyError(f"Unknown job kind: {record.kind}")
+            result = fn(JobContext(record), **json.loads(record.payload or "{}"))
+        except Exception:
+            db.session.rollback()
+            record = db.session.get(Job, record.id)
+            record.error = traceback.format_exc(limit=5)
+            if record.attempts < record.max_attempts:
+                record.status = "queued"
+                record.run_after = utcnow() + timedelta(
+                    seconds=self.backoff * 2 ** (record.attempts - 1)
+                )
+            else:
+                record.status = "failed"
+                record.finished_at = utcnow()
+        else:
+            record = db.session.get(Job, record.id)
+            record.status = "succeeded"
+            record.progress = 1.0
+            record.result = json.dumps(result)
+            record.error = None
+            record.finished_at = utcnow()
+        finally:
+            done.set()
+            heartbeat.join()
+        record.locked_by = None
+        db.session.commit()
+        return True
+
+    def _heartbeat(self, job_id, name, done):
+        # Renew the lease while the job runs, so a long job is never taken
+        # for a crashed one and re-queued alongside itself.
+        while not done.wait(self.lease.total_seconds() / 3):
+            try:
+                with self.app.app_context(), db.engine.begin() as conn:
+                    conn.execute(
+                        update(Job)
+                        .where(Job.id == job_id, Job.locked_by == name)
+                        .values(locked_at=utcnow())
+                    )
+            except Exception:
+                self.app.logger.exception("Job heartbeat failed")
+
+    def _claim(self, name):
+        now = utcnow()
+        expired = (Job.status == "running", Job.locked_at < now - self.lease)
+        # A job that keeps killing its worker (out of memory, say) never gets
+        # to record a failure itself, so its lost attempts count here.
+        db.session.execute(
+            update(Job)
+            .where(*expired, Job.attempts >= Job.max_attempts)
+            .values(
+                status="failed",
+                locked_by=None,
+                error="Worker lost: lease expired on the last attempt",
+                finished_at=now,
+            )
+        )
+        db.session.execute(
+            update(Job).where(*expired).values(status="queued", locked_by=None)
+        )
+        candidates = db.session.execute(
+            db.select(Job.id)
+            .where(Job.status == "queued", Job.run_after <= now)
+            .order_by(Job.run_after, Job.id)
+            .limit(5)
+        ).scalars()
+        for job_id in list(candidates):
+            claimed = db.session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == "queued")
+                .values(
+                    status="running",
+                    locked_by=name,
+                    locked_at=now,
+                    attempts=Job.attempts + 1,
+                )
+            )
+            db.session.commit()
+            if claimed.rowcount == 1:
+                return db.session.get(Job, job_id)
+        db.session.commit()
+        return None
+
+
+def _run_worker_process(app, threads):
+    with app.app_context():
+        # Connections inherited across fork must not be shared with the parent.
+        db.engine.dispose(close=False)
+    worker = JobWorker(app, threads)
+    worker.start()
+    worker.join()
+
+
+def init_app(app):
+    """Register the `flask worker` command and optional in-process workers."""
+
+    @app.cli.command("worker")
+    @click.option("--threads", default=2, help="Worker threads per process.")
+    @click.option("--processes", default=1, help="Worker processes to fork.")
+    def worker_command(threads, processes):
+        """Run background jobs until interrupted."""
+        if processes <= 1:
+            _run_worker_process(app, threads)
+            return
+        children = [
+            multiprocessing.Process(target=_run_worker_process, args=(app, threads))
+            for _ in range(processes)
+        ]
+        for child in children:
+            child.start()
+        for child in children:
+            child.join()
+
+    threads = app.config.get("JOBS_IN_PROCESS_THREADS", 0)
+    if not threads:
+        return
+
+    state = {"worker": None}
+    lock = threading.Lock()
+
+    @app.before_request
+    def start_in_process_worker():
+        # Started on the first request so that it runs in each gunicorn
+        # worker after forking, and never inside CLI commands.
+        if state["worker"] is None:
+            with lock:
+                if state["worker"] is None:
+                    state["worker"] = JobWorker(app, threads)
+                    state["worker"].start()
@@ -1,7 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import validates
 from werkzeug.security import generate_password_hash, check_password_hash
+from .db_routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 
 class User(db.Model):
@@ -10,6 +12,19 @@ class User(db.Model):
     email = db.Column(db.String(100), unique=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)
+    # Case-folded copies for indexed prefix search in the admin directory
+    email_lower = db.Column(db.String(100), index=True)
+    name_lower = db.Column(db.String(100), index=True)
+
+    @validates("email")
+    def _fold_email(self, key, value):
+        self.email_lower = value.casefold() if value else None
+        return value
+
+    @validates("name")
+    def _fold_name(self, key, value):
+        self.name_lower = value.casefold() if value else None
+        return value
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -23,6 +38,12 @@ class Category(db.Model):
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     image = db.Column(db.String(500))  # Image URL or path
+    updated_at = db.Column(
+        db.DateTime,
+        default=db.func.current_timestamp(),
+        onupdate=db.func.current_timestamp(),
+    )
+    change_seq = db.Column(db.Integer, index=True)  # See CatalogSequence
 
     def __repr__(self):
         return f"<Category {self.name}>"
@@ -37,6 +58,12 @@ class Product(db.Model):
     image = db.Column(db.String(500))  # Image URL or path
     category_id = db.Column(db.Integer, db.ForeignKey("category.id"), nullable=False)
     rating = db.Column(db.Float, default=0.0)
+    updated_at = db.Column(
+        db.DateTime,
+        default=db.func.current_timestamp(),
+        onupdate=db.func.current_timestamp(),
+    )
+    change_seq = db.Column(db.Integer, index=True)  # See CatalogSequence
 
     category = db.relationship("Category", backref=db.backref("products", lazy=True))
 
@@ -87,12 +114,14 @@ class CartItem(db.Model):
 
 class Order(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("user.id"), nullable=False, index=True
+    )
     total_amount = db.Column(db.Float, nullable=False)
     status = db.Column(
         db.String(50), default="pending"
     )  # pending, confirmed, shipped, delivered
-    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp(), index=True)
     shipping_address = db.Column(db.Text)
     billing_address = db.Column(db.Text)
 
@@ -114,3 +143,97 @@ class OrderItem(db.Model):
 
     def __repr__(self):
         return f"<OrderItem {self.quantity} x {self.product_id}>"
+
+
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(100), nullable=False)
+    status = db.Column(
+        db.String(20), nullable=False, default="queued", index=True
+    )  # queued, running, succeeded, failed
+    payload = db.Column(db.Text)  # JSON keyword arguments for the job function
+    result = db.Column(db.Text)  # JSON return value
+    error = db.Column(db.Text)
+    progress = db.Column(db.Float, default=0.0)
+    checkpoint = db.Column(db.Text)  # JSON state saved by the job to resume from
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, index=True)
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.kind} {self.status}>"
+
+
+class ProductCooccurrence(db.Model):
+    # Orders containing both products. The diagonal row (product_id ==
+    # related_product_id) holds the product's own order count.
+    product_id = db.Column(db.Integer, primary_key=True)
+    related_product_id = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ProductCooccurrence {self.product_id}-{self.related_product_id}>"
+
+
+class RelatedProduct(db.Model):
+    # Precomputed top-N "frequently bought together" neighbours
+    product_id = db.Column(db.Integer, primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    related_product_id = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f"<RelatedProduct {self.product_id} #{self.rank}>"
+
+
+class RecommendationRun(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    last_order_id = db.Column(db.Integer, nullable=False)
+    method = db.Column(db.String(20), nullable=False)
+    products_updated = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    def __repr__(self):
+        return f"<RecommendationRun {self.id} up to order {self.last_order_id}>"
+
+
+class OrderEvent(db.Model):
+    # Append-only log of order changes; the id doubles as the SSE event id
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey("order.id"), nullable=False)
+    type = db.Column(db.String(50), nullable=False)  # created, status_changed
+    status = db.Column(db.String(50), nullable=False)
+    data = db.Column(db.Text)  # JSON details of the change
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    def __repr__(self):
+        return f"<OrderEvent {self.id} {self.type} order {self.order_id}>"
+
+
+class CatalogSequence(db.Model):
+    # Single-row counter behind Product/Category.change_seq. Writers bump it
+    # inside their transaction, which holds the row lock until commit, so
+    # sequence numbers become visible in increasing order.
+    id = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CatalogSequence {self.value}>"
+
+
+class CatalogTombstone(db.Model):
+    # Deleted products and categories, kept so delta syncs can see deletes
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # product, category
+    entity_id = db.Column(db.Integer, nullable=False)
+    change_seq = db.Column(db.Integer, nullable=False, index=True)
+    deleted_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    def __repr__(self):
+        return f"<CatalogTombstone {self.kind} {self.entity_id}>"
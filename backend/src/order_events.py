@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from .models import db, Order, OrderEvent, User
+
+# Wakes streams in this process as soon as an event is committed; streams in
+# other processes pick it up on their next poll.
+_committed = threading.Condition()
+
+
+def record_order_event(order, event_type, **data):
+    """Add an event for `order` to the session; it is written on commit."""
+    db.session.add(
+        OrderEvent(
+            order_id=order.id,
+            type=event_type,
+            status=order.status,
+            data=json.dumps(data),
+        )
+    )
+    db.session.info["order_events"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_streams(session):
+    if session.info.pop("order_events", False):
+        with _committed:
+            _committed.notify_all()
+
+
+def _ticket_serializer():
+    return URLSafeTimedSerializer(
+        current_app.config["JWT_SECRET_KEY"], salt="order-event-stream"
+    )
+
+
+def issue_stream_ticket(user_id):
+    """
+    A short-lived ticket that opens the order stream for `user_id`.
+
+    EventSource cannot send headers, so the ticket travels in the URL. It
+    expires after ORDER_STREAM_TICKET_SECONDS, and it is not a JWT, so a
+    copy in an access log cannot call any other endpoint.
+    """
+    return _ticket_serializer().dumps({"user_id": user_id})
+
+
+def read_stream_ticket(ticket):
+    """The user id in a valid, unexpired ticket, else None."""
+    try:
+        data = _ticket_serializer().loads(
+            ticket,
+            max_age=current_app.config.get("ORDER_STREAM_TICKET_SECONDS", 60),
+        )
+    except BadSignature:
+        return None
+    return data.get("user_id")
+
+
+def latest_event_id():
+    return db.session.execute(select(func.max(OrderEvent.id))).scalar() or 0
+
+
+def events_after(last_id, limit=100):
+    """
+    Events after `last_id`, oldest first. Each carries the order as the
+    compact orders table shows it, so clients can apply it directly.
+    """
+    rows = db.session.execute(
+        select(
+            OrderEvent,
+            Order.total_amount,
+            Order.created_at.label("order_created_at"),
+            User.name,
+            User.email,
+        )
+        .join(Order, Order.id == OrderEvent.order_id)
+        .join(User, User.id == Order.user_id)
+        .where(OrderEvent.id > last_id)
+        .order_by(OrderEvent.id)
+        .limit(limit)
+    ).all()
+    return [
+        {
+            "id": e.id,
+            "order_id": e.order_id,
+            "type": e.type,
+            "status": e.status,
+            "data": json.loads(e.data) if e.data else {},
+            "created_at": e.created_at.isoformat(),
+            "order": {
+                "id": e.order_id,
+                "user_name": name,
+                "user_email": email,
+                "total_amount": total_amount,
+                "status": e.status,
+                "created_at": order_created_at.isoformat(),
+            },
+        }
+        for e, total_amount, order_created_at, name, email in rows
+    ]
+
+
+def stream_events(last_id, max_seconds, poll_seconds=2, keepalive_seconds=15):
+    """
+    Yield server-sent-event frames for events after `last_id`.
+
+    The stream ends after `max_seconds`; the browser's EventSource then
+    reconnects with Last-Event-ID and resumes where it left off, so no
+    connection holds a worker thread indefinitely.
+    """
+    yield f"retry: {poll_seconds * 1000}\n\n"
+    deadline = time.monotonic() + max_seconds
+    last_sent = time.monotonic()
+    while time.monotonic() < deadline:
+        events = events_after(last_id)
+        # End the read transaction so each poll sees newly committed rows.
+        db.session.rollback()
+        for e in events:
+            last_id = e["id"]
+            yield f"id: {e['id']}\nevent: {e['type']}\ndata: {json.dumps(e)}\n\n"
+            last_sent = time.monotonic()
+        if events:
+            continue
+        if time.monotonic() - last_sent >= keepalive_seconds:
+            yield ": keepalive\n\n"
+            last_sent = time.monotonic()
+        with _committed:
+            _committed.wait(poll_seconds)
@@ -0,0 +1,185 @@
+import cProfile
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from urllib.parse import urlencode
+
+from flask import g, has_request_context, request
+from flask_jwt_extended import decode_token
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .models import User
+
+PROFILE_NAME = re.compile(r"^[\w.-]+\.(prof|sql\.json)$")
+
+# Query arguments that carry credentials; never written to profile files.
+SECRET_ARGS = ("ticket", "token")
+
+
+class RequestProfiler:
+    """
+    Opt-in per-request profiling.
+
+    A request is profiled when an admin sends the X-Profile header, or at
+    random for PROFILE_SAMPLE_RATE of traffic. Each profile is a cProfile
+    .prof file (open with snakeviz, or flameprof for a flame graph) and a
+    .sql.json file with every statement and its duration, kept in
+    PROFILE_DIR and trimmed to PROFILE_MAX_BYTES, oldest first.
+    """
+
+    def __init__(self):
+        self.directory = None
+        self.sample_rate = 0.0
+        self.max_bytes = 50 * 1024 * 1024
+        self._rotate_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.directory = os.path.abspath(
+            app.config.get("PROFILE_DIR", "instance/profiles")
+        )
+        self.sample_rate = app.config.get("PROFILE_SAMPLE_RATE", self.sample_rate)
+        self.max_bytes = app.config.get("PROFILE_MAX_BYTES", self.max_bytes)
+        os.makedirs(self.directory, exist_ok=True)
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+
+    def _requested_by_admin(self):
+        if "X-Profile" not in request.headers:
+            return False
+        auth = request.headers.get("Authorization", "")
+        if not auth.startswith("Bearer "):
+            return False
+        try:
+            user = User.query.get(int(decode_token(auth[7:])["sub"]))
+        except Exception:
+            return False
+        return bool(user and user.is_admin)
+
+    def _start(self):
+        if not (
+            self._requested_by_admin()
+            or (self.sample_rate and random.random() < self.sample_rate)
+        ):
+            return
+        g._profile_sql = []
+        g._profile_started = time.perf_counter()
+        g._profiler = cProfile.Profile()
+        g._profiler.enable()
+
+    def _finish(self, response):
+        profiler = g.pop("_profiler", None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        elapsed = time.perf_counter() - g._profile_started
+        statements = g.pop("_profile_sql")
+
+        slug = re.sub(r"[^\w]+", "_", request.path).strip("_") or "root"
+        name = (
+            f"{time.strftime('%Y%m%dT%H%M%S')}-{request.method}-{slug[:60]}"
+            f"-{uuid.uuid4().hex[:6]}"
+        )
+        profiler.dump_stats(os.path.join(self.directory, f"{name}.prof"))
+        with open(os.path.join(self.directory, f"{name}.sql.json"), "w") as f:
+            json.dump(
+                {
+                    "method": request.method,
+                    "path": _recorded_path(),
+                    "endpoint": request.endpoint,
+                    "status": response.status_code,
+                    "duration_ms": round(elapsed * 1000, 3),
+                    "sql_count": len(statements),
+                    "sql_ms": round(sum(s["duration_ms"] for s in statements), 3),
+                    "statements": statements,
+                },
+                f,
+            )
+        self._rotate()
+        response.headers["X-Profile-Id"] = name
+        return response
+
+    def _teardown(self, exc):
+        # after_request is skipped on unhandled errors; never leave the
+        # profiler running on this thread.
+        profiler = g.pop("_profiler", None)
+        if profiler is not None:
+            profiler.disable()
+
+    def _rotate(self):
+        # The lock serializes threads in this process; other gunicorn workers
+        # can still delete the same files, so a file vanishing is expected.
+        with self._rotate_lock:
+            files = []
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+            files.sort()
+            total = sum(size for _, size, _ in files)
+            for _, size, path in files:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def list_profiles(self):
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not name.endswith(".sql.json"):
+                continue
+            base = name[: -len(".sql.json")]
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    meta = json.load(f)
+            except FileNotFoundError:
+                # Rotated away since listdir().
+                continue
+            meta.pop("statements", None)
+            meta["id"] = base
+            meta["files"] = [f"{base}.prof", name]
+            profiles.append(meta)
+        return profiles
+
+
+def _recorded_path():
+    query = urlencode(
+        [
+            (k, "REDACTED" if k in SECRET_ARGS else v)
+            for k, v in request.args.items(multi=True)
+        ]
+    )
+    return f"{request.path}?{query}" if query else request.path
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and g.get("_profile_sql") is not None:
+        conn.info.setdefault("profile_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("profile_start")
+    if not starts or not has_request_context() or g.get("_profile_sql") is None:
+        return
+    g._profile_sql.append(
+        {
+            "statement": statement,
+            "duration_ms": round((time.perf_counter() - starts.pop()) * 1000, 3),
+        }
+    )
+
+
+request_profiler = RequestProfiler()
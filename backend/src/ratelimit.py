@@ -0,0 +1,267 @@
+import os
+import sqlite3
+import threading
+import time
+
+from flask import Response, request
+from flask_jwt_extended import decode_token
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+_TOO_MANY = b'{"message": "Too many requests"}'
+_OVERLOADED = b'{"message": "Server busy, please retry"}'
+
+
+def parse_policy(policy):
+    """Parse "10/minute" into (refill rate per second, burst capacity)."""
+    count, _, period = policy.partition("/")
+    count = int(count)
+    return count / _PERIODS[period.strip()], count
+
+
+class MemoryBackend:
+    """Token buckets held in this process; fastest, but per gunicorn worker."""
+
+    _SWEEP_EVERY = 1000
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    def take(self, key, rate, burst, now):
+        with self._lock:
+            self._calls += 1
+            if self._calls % self._SWEEP_EVERY == 0:
+                self._sweep(now)
+            tokens, updated, _ = self._buckets.get(key, (burst, now, 0))
+            tokens, wait = _refill_and_take(tokens, updated, rate, burst, now)
+            self._buckets[key] = (tokens, now, now + burst / rate)
+            return wait
+
+    def _sweep(self, now):
+        # A bucket that has refilled completely is the same as a missing one.
+        full = [k for k, (_, _, full_at) in self._buckets.items() if full_at <= now]
+        for key in full:
+            del self._buckets[key]
+
+
+class SQLiteBackend:
+    """
+    Token buckets in a local SQLite file, shared by every worker process.
+
+    If the file stays locked past the busy timeout, the request is let
+    through: a rate limiter that fails with 500s during a burst would do
+    more harm than the burst.
+    """
+
+    _SWEEP_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets "
+            "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, "
+            "full_at REAL NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(buckets)")}
+        if "full_at" not in columns:
+            conn.execute(
+                "ALTER TABLE buckets ADD COLUMN full_at REAL NOT NULL DEFAULT 0"
+            )
+        conn.execute("CREATE INDEX IF NOT EXISTS buckets_full_at ON buckets (full_at)")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rate, burst, now):
+        conn = self._connection()
+        self._calls += 1
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            return 0
+        try:
+            if self._calls % self._SWEEP_EVERY == 0:
+                self._sweep(conn, now)
+            row = conn.execute(
+                "SELECT tokens, updated FROM buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row if row else (burst, now)
+            tokens, wait = _refill_and_take(tokens, updated, rate, burst, now)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated, full_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + (burst - tokens) / rate),
+            )
+            conn.execute("COMMIT")
+        except sqlite3.OperationalError:
+            conn.execute("ROLLBACK")
+            return 0
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def _sweep(self, conn, now):
+        # A bucket that has refilled completely is the same as a missing one.
+        conn.execute("DELETE FROM buckets WHERE full_at <= ?", (now,))
+
+
+def _refill_and_take(tokens, updated, rate, burst, now):
+    """Return (remaining tokens, seconds to wait); wait is 0 when allowed."""
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, (1 - tokens) / rate
+
+
+class RateLimiter:
+    """
+    Per-client token-bucket rate limiting.
+
+    Policies are looked up by endpoint name first ("admin.admin_login") and
+    then by blueprint name ("auth"); requests matching neither are not
+    limited. Each request draws from a bucket keyed by client IP and, when a
+    valid bearer token is present, a second bucket keyed by JWT identity.
+    """
+
+    def __init__(self, app=None):
+        self.policies = {}
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get("RATELIMIT_ENABLED", True):
+            return
+        self.policies = {
+            name: parse_policy(policy)
+            for name, policy in app.config.get("RATELIMIT_POLICIES", {}).items()
+        }
+        storage = app.config.get("RATELIMIT_STORAGE")
+        if storage:
+            self.backend = SQLiteBackend(storage)
+        else:
+            self.backend = MemoryBackend()
+        app.before_request(self._check)
+
+    def _policy(self):
+        if request.endpoint in self.policies:
+            return request.endpoint, self.policies[request.endpoint]
+        if request.blueprint in self.policies:
+            return request.blueprint, self.policies[request.blueprint]
+        return None, None
+
+    def _client_ip(self):
+        # The real client address when ProxyFix is configured for the
+        # proxies in front of the app (see TRUSTED_PROXY_HOPS).
+        return request.remote_addr or "unknown"
+
+    def _identity(self):
+        auth = request.headers.get("Authorization", "")
+        if not auth.startswith("Bearer "):
+            return None
+        try:
+            return decode_token(auth[7:])["sub"]
+        except Exception:
+            return None
+
+    def _check(self):
+        if request.method == "OPTIONS":
+            return None
+        scope, policy = self._policy()
+        if policy is None:
+            return None
+        rate, burst = policy
+        now = time.time()
+        wait = self.backend.take(f"ip:{self._client_ip()}:{scope}", rate, burst, now)
+        identity = self._identity()
+        if identity is not None:
+            wait = max(
+                wait, self.backend.take(f"user:{identity}:{scope}", rate, burst, now)
+            )
+        if wait:
+            return Response(
+                _TOO_MANY,
+                status=429,
+                mimetype="application/json",
+                headers={"Retry-After": str(int(wait) + 1)},
+            )
+        return None
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    WSGI middleware that sheds load once a process is serving too many
+    requests at once, answering 503 before Flask does any work.
+
+    Long-lived responses such as event streams can be given their own limit
+    with `streams` ({path: max connections}). They then never take the
+    slots ordinary requests need, and the number of open streams stays
+    bounded on its own.
+
+    Only meaningful with threaded workers (gthread); a sync worker never
+    serves more than one request at a time.
+    """
+
+    def __init__(self, wsgi_app, max_concurrent, retry_after=1, streams=None):
+        self.wsgi_app = wsgi_app
+        self.retry_after = str(retry_after)
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._stream_slots = {
+            path: threading.BoundedSemaphore(limit)
+            for path, limit in (streams or {}).items()
+        }
+
+    def __call__(self, environ, start_response):
+        slots = self._stream_slots.get(environ.get("PATH_INFO"), self._slots)
+        if not slots.acquire(blocking=False):
+            start_response(
+                "503 Service Unavailable",
+                [
+                    ("Content-Type", "application/json"),
+                    ("Content-Length", str(len(_OVERLOADED))),
+                    ("Retry-After", self.retry_after),
+                ],
+            )
+            return [_OVERLOADED]
+        try:
+            result = self.wsgi_app(environ, start_response)
+        except Exception:
+            slots.release()
+            raise
+        return _ReleasingIterable(result, slots)
+
+
+class _ReleasingIterable:
+    """Hold the concurrency slot until the server has sent the whole body."""
+
+    def __init__(self, iterable, slots):
+        self._iterable = iterable
+        self._slots = slots
+
+    def __iter__(self):
+        return iter(self._iterable)
+
+    def close(self):
+        try:
+            if hasattr(self._iterable, "close"):
+                self._iterable.close()
+        finally:
+            self._slots.release()
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,222 @@
+import click
+import numpy as np
+from scipy import sparse
+from sqlalchemy import delete, func, insert, select, update
+
+from .jobs import job
+from .models import (
+    db,
+    Order,
+    OrderItem,
+    ProductCooccurrence,
+    RecommendationRun,
+    RelatedProduct,
+)
+
+METHODS = ("cosine", "lift")
+
+# Stay under SQLite's bound-parameter limit in IN clauses and bulk writes.
+_CHUNK = 900
+
+
+def _chunks(values):
+    values = list(values)
+    for i in range(0, len(values), _CHUNK):
+        yield values[i : i + _CHUNK]
+
+
+def cooccurrence_counts(order_ids, product_ids):
+    """
+    Count co-purchases from parallel (order_id, product_id) arrays.
+
+    Returns (a, b, count) arrays over every pair bought together in at least
+    one order, including a == b, whose count is the product's order count.
+    """
+    orders, order_idx = np.unique(order_ids, return_inverse=True)
+    products, product_idx = np.unique(product_ids, return_inverse=True)
+    x = sparse.csr_matrix(
+        (np.ones(len(order_idx), dtype=np.int32), (order_idx, product_idx)),
+        shape=(len(orders), len(products)),
+    )
+    x.data[:] = 1  # an order counts once even if a product appears twice
+    c = (x.T @ x).tocoo()
+    return products[c.row], products[c.col], c.data
+
+
+def score_pairs(a, b, counts, diagonal, total_orders, method):
+    """Score pairs by cosine or lift from their counts and the diagonal."""
+    count_a = diagonal[a].astype(np.float64)
+    count_b = diagonal[b].astype(np.float64)
+    if method == "lift":
+        return counts * total_orders / (count_a * count_b)
+    return counts / np.sqrt(count_a * count_b)
+
+
+def top_n(a, b, scores, n):
+    """Keep the n best-scoring b per a; returns (a, b, score, rank)."""
+    order = np.lexsort((-scores, a))
+    a, b, scores = a[order], b[order], scores[order]
+    starts = np.flatnonzero(np.r_[True, a[1:] != a[:-1]])
+    group_start = np.repeat(starts, np.diff(np.r_[starts, len(a)]))
+    rank = np.arange(len(a)) - group_start
+    keep = rank < n
+    return a[keep], b[keep], scores[keep], rank[keep]
+
+
+def build_related(full=False, method="cosine", n=10):
+    """
+    Refresh the related_product table from OrderItem co-occurrence.
+
+    Incremental runs add the counts of orders placed since the last run and
+    re-rank only the products whose scores changed: those in the new orders
+    and their existing neighbours. With lift the total order count also
+    moves, which rescales every score but does not reorder a product's
+    neighbours, so unaffected rows keep slightly stale scores until the next
+    full run. A run with a different method than the last one is always
+    full, so the table never mixes cosine and lift scores.
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}")
+    last_run = db.session.execute(
+        select(RecommendationRun).order_by(RecommendationRun.id.desc()).limit(1)
+    ).scalar_one_or_none()
+    if last_run is not None and last_run.method != method:
+        full = True
+    since = 0 if full or last_run is None else last_run.last_order_id
+    if full:
+        db.session.execute(delete(ProductCooccurrence))
+        db.session.execute(delete(RelatedProduct))
+
+    rows = db.session.execute(
+        select(OrderItem.order_id, OrderItem.product_id).where(
+            OrderItem.order_id > since
+        )
+    ).all()
+    if not rows:
+        db.session.add(
+            RecommendationRun(last_order_id=since, method=method, products_updated=0)
+        )
+        db.session.commit()
+        return 0
+    pairs = np.array(rows, dtype=np.int64)
+    a, b, counts = cooccurrence_counts(pairs[:, 0], pairs[:, 1])
+
+    touched = set(np.unique(a).tolist())
+    _merge_counts(a, b, counts, touched)
+
+    affected = set(touched)
+    for chunk in _chunks(touched):
+        affected.update(
+            db.session.execute(
+                select(ProductCooccurrence.related_product_id).where(
+                    ProductCooccurrence.product_id.in_(chunk)
+                )
+            ).scalars()
+        )
+    _rerank(affected, method, n)
+
+    db.session.add(
+        RecommendationRun(
+            last_order_id=int(pairs[:, 0].max()),
+            method=method,
+            products_updated=len(affected),
+        )
+    )
+    db.session.commit()
+    return len(affected)
+
+
+def _merge_counts(a, b, counts, touched):
+    existing = {}
+    for chunk in _chunks(touched):
+        for row in db.session.execute(
+            select(
+                ProductCooccurrence.product_id,
+                ProductCooccurrence.related_product_id,
+                ProductCooccurrence.count,
+            ).where(ProductCooccurrence.product_id.in_(chunk))
+        ):
+            existing[(row[0], row[1])] = row[2]
+
+    inserts, updates = [], []
+    for pa, pb, count in zip(a.tolist(), b.tolist(), counts.tolist()):
+        values = {"product_id": pa, "related_product_id": pb}
+        if (pa, pb) in existing:
+            values["count"] = existing[(pa, pb)] + count
+            updates.append(values)
+        else:
+            values["count"] = count
+            inserts.append(values)
+    for chunk in _chunks(inserts):
+        db.session.execute(insert(ProductCooccurrence), chunk)
+    for chunk in _chunks(updates):
+        db.session.execute(update(ProductCooccurrence), chunk)
+
+
+def _rerank(affected, method, n):
+    rows = []
+    for chunk in _chunks(affected):
+        rows += db.session.execute(
+            select(
+                ProductCooccurrence.product_id,
+                ProductCooccurrence.related_product_id,
+                ProductCooccurrence.count,
+            ).where(ProductCooccurrence.product_id.in_(chunk))
+        ).all()
+    if not rows:
+        return
+    data = np.array(rows, dtype=np.int64)
+    a, b, counts = data[:, 0], data[:, 1], data[:, 2]
+
+    diagonal_rows = []
+    for chunk in _chunks(np.unique(b).tolist()):
+        diagonal_rows += db.session.execute(
+            select(ProductCooccurrence.product_id, ProductCooccurrence.count).where(
+                ProductCooccurrence.product_id.in_(chunk),
+                ProductCooccurrence.product_id
+                == ProductCooccurrence.related_product_id,
+            )
+        ).all()
+    diag = np.array(diagonal_rows, dtype=np.int64)
+    diagonal = np.zeros(diag[:, 0].max() + 1, dtype=np.int64)
+    diagonal[diag[:, 0]] = diag[:, 1]
+
+    off_diagonal = a != b
+    a, b, counts = a[off_diagonal], b[off_diagonal], counts[off_diagonal]
+    total_orders = db.session.execute(select(func.count(Order.id))).scalar()
+    scores = score_pairs(a, b, counts, diagonal, total_orders, method)
+    a, b, scores, rank = top_n(a, b, scores, n)
+
+    for chunk in _chunks(affected):
+        db.session.execute(
+            delete(RelatedProduct).where(RelatedProduct.product_id.in_(chunk))
+        )
+    values = [
+        {
+            "product_id": pa,
+            "related_product_id": pb,
+            "score": score,
+            "rank": r,
+        }
+        for pa, pb, score, r in zip(
+            a.tolist(), b.tolist(), scores.tolist(), rank.tolist()
+        )
+    ]
+    for chunk in _chunks(values):
+        db.session.execute(insert(RelatedProduct), chunk)
+
+
+@job("build_related_products")
+def build_related_job(ctx, full=False, method="cosine", n=10):
+    return {"products_updated": build_related(full=full, method=method, n=n)}
+
+
+def init_app(app):
+    @app.cli.command("build-related")
+    @click.option("--full", is_flag=True, help="Rebuild from every order.")
+    @click.option("--method", type=click.Choice(METHODS), default="cosine")
+    @click.option("--top", "n", default=10, help="Neighbours kept per product.")
+    def build_related_command(full, method, n):
+        """Refresh "frequently bought together" recommendations."""
+        updated = build_related(full=full, method=method, n=n)
+        click.echo(f"Updated recommendations for {updated} products")
@@ -1,5 +1,18 @@
 from .auth import auth_bp
 from .admin import admin_bp
+from .catalog import catalog_bp
+from .media import media_bp
+from .pages import page_bp
 from .user import category_bp, product_bp, cart_bp, order_bp
 
-__all__ = ["auth_bp", "admin_bp", "category_bp", "product_bp", "cart_bp", "order_bp"]
+__all__ = [
+    "auth_bp",
+    "admin_bp",
+    "catalog_bp",
+    "media_bp",
+    "page_bp",
+    "category_bp",
+    "product_bp",
+    "cart_bp",
+    "order_bp",
+]
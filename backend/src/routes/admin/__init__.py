@@ -1,6 +1,34 @@
-from flask import Blueprint, request, jsonify
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    request,
+    jsonify,
+    send_from_directory,
+    stream_with_context,
+)
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from ...models import db, User, Category, Product, Order
+from ...analytics import GRANULARITIES, GROUP_BYS, sales_report
+from ...db_routing import use_primary
+from ...fields import Projection, column, computed
+from ...images import (
+    LINE_ITEM_WIDTH,
+    THUMBNAIL_WIDTHS,
+    ImageError,
+    pillow_available,
+    store_image,
+    thumbnail_url,
+)
+from ...jobs import enqueue, job, schedule, serialize_job, utcnow
+from ...models import db, User, Category, Product, Order, Job, ShoppingCart
+from ...profiling import PROFILE_NAME, request_profiler
+from ...order_events import (
+    issue_stream_ticket,
+    latest_event_id,
+    read_stream_ticket,
+    record_order_event,
+    stream_events,
+)
 
 admin_bp = Blueprint("admin", __name__)
 
@@ -13,8 +41,88 @@ def get_dashboard_stats():
     if not user or not user.is_admin:
         return jsonify({"message": "Admin access required"}), 403
 
+    # Serve the stats from the last dashboard_stats job, queueing a refresh
+    # once they are older than DASHBOARD_STATS_MAX_AGE. Only the very first
+    # request computes them inline.
+    import json
+    from datetime import timedelta
+
+    record = (
+        Job.query.filter_by(kind="dashboard_stats", status="succeeded")
+        .order_by(Job.finished_at.desc())
+        .first()
+    )
+    max_age = timedelta(seconds=current_app.config.get("DASHBOARD_STATS_MAX_AGE", 300))
+    if record is None or utcnow() - record.finished_at > max_age:
+        schedule("dashboard_stats")
+    if record is None:
+        stats = dashboard_stats()
+        stats["generated_at"] = utcnow().isoformat()
+    else:
+        stats = json.loads(record.result)
+        stats["generated_at"] = record.finished_at.isoformat()
+    return jsonify(stats), 200
+
+
+@admin_bp.route("/dashboard/refresh", methods=["POST"])
+@jwt_required()
+def refresh_dashboard_stats():
+    current_user_id = int(get_jwt_identity())
+    user = User.query.get(current_user_id)
+    if not user or not user.is_admin:
+        return jsonify({"message": "Admin access required"}), 403
+    record = enqueue("dashboard_stats")
+    return jsonify({"job_id": record.id, "status": record.status}), 202
+
+
+@admin_bp.route("/analytics", methods=["GET"])
+@jwt_required()
+def get_sales_analytics():
+    """
+    Revenue, units and average order value over a date range.
+
+    Query Parameters:
+    - start (str): First day, YYYY-MM-DD (default: 30 days before end)
+    - end (str): Last day, inclusive, YYYY-MM-DD (default: today)
+    - granularity (str): day, week or month (default: day)
+    - group_by (str): period, product or category (default: period); rows
+      grouped by product or category report revenue_per_order (the group's
+      revenue over the orders containing it) instead of average_order_value
+    - statuses (str): Comma-separated order statuses to count
+      (default: confirmed,shipped,delivered)
+    """
+    current_user_id = int(get_jwt_identity())
+    user = User.query.get(current_user_id)
+    if not user or not user.is_admin:
+        return jsonify({"message": "Admin access required"}), 403
+
+    from datetime import date, timedelta
+
+    try:
+        end = date.fromisoformat(request.args.get("end", date.today().isoformat()))
+        start = request.args.get("start")
+        start = date.fromisoformat(start) if start else end - timedelta(days=30)
+    except ValueError:
+        return jsonify({"message": "Dates must be YYYY-MM-DD"}), 400
+    if start > end:
+        return jsonify({"message": "start must not be after end"}), 400
+    granularity = request.args.get("granularity", "day")
+    group_by = request.args.get("group_by", "period")
+    if granularity not in GRANULARITIES or group_by not in GROUP_BYS:
+        return jsonify({"message": "Invalid granularity or group_by"}), 400
+    statuses = request.args.get("statuses")
+    statuses = [s for s in statuses.split(",") if s] if statuses else None
+
+    return jsonify(sales_report(start, end, granularity, group_by, statuses)), 200
+
+
+def dashboard_stats():
     from sqlalchemy import func, extract
 
+    # Order events after this id are not in the stats; the dashboard applies
+    # them from /admin/orders/stream.
+    last_event_id = latest_event_id()
+
     # Count stats
     total_products = Product.query.count()
     total_categories = Category.query.count()
@@ -79,25 +187,26 @@ def get_dashboard_stats():
         ).count()
         monthly_orders[month_start.strftime("%B")] = count
 
-    return (
-        jsonify(
-            {
-                "stats": {
-                    "total_products": total_products,
-                    "total_categories": total_categories,
-                    "total_users": total_users,
-                    "total_orders": total_orders,
-                    "active_orders": active_orders,
-                    "total_revenue": total_revenue,
-                    "monthly_revenue": monthly_revenue,
-                },
-                "recent_orders": recent_orders_data,
-                "categories": category_data,
-                "monthly_orders": monthly_orders,
-            }
-        ),
-        200,
-    )
+    return {
+        "stats": {
+            "total_products": total_products,
+            "total_categories": total_categories,
+            "total_users": total_users,
+            "total_orders": total_orders,
+            "active_orders": active_orders,
+            "total_revenue": total_revenue,
+            "monthly_revenue": monthly_revenue,
+        },
+        "recent_orders": recent_orders_data,
+        "categories": category_data,
+        "monthly_orders": monthly_orders,
+        "last_event_id": last_event_id,
+    }
+
+
+@job("dashboard_stats")
+def dashboard_stats_job(ctx):
+    return dashboard_stats()
 
 
 @admin_bp.route("/login", methods=["POST"])
@@ -119,16 +228,82 @@ def admin_login():
 @admin_bp.route("/users", methods=["GET"])
 @jwt_required()
 def list_users():
+    """
+    List users a page at a time, ordered by ID.
+
+    Query Parameters:
+    - limit (int): Users per page (default: 50, max: 200)
+    - cursor (str): next_cursor from the previous page
+    - q (str): Case-insensitive prefix of the email or name
+    - is_admin (bool): Only admins (true) or only customers (false)
+    - include_stats (bool): Add order_count and lifetime_value per user
+    - include_counts (bool): Add total, admin and customer counts for `q`
+    """
     current_user_id = get_jwt_identity()
     user = User.query.get(int(current_user_id))
     if not user or not user.is_admin:
         return jsonify({"message": "Admin access required"}), 403
-    users = User.query.all()
-    user_list = [
-        {"id": u.id, "name": u.name, "email": u.email, "is_admin": u.is_admin}
-        for u in users
-    ]
-    return jsonify({"users": user_list}), 200
+
+    from sqlalchemy import func, or_
+
+    limit = max(1, min(request.args.get("limit", 50, type=int), 200))
+    cursor = request.args.get("cursor", 0, type=int)
+    q = request.args.get("q", "", type=str).strip().casefold()
+    is_admin = request.args.get("is_admin", type=str)
+    include_stats = request.args.get("include_stats", "").lower() in ("1", "true")
+    include_counts = request.args.get("include_counts", "").lower() in ("1", "true")
+
+    columns = [User.id, User.name, User.email, User.is_admin]
+    if include_stats:
+        columns += [
+            func.count(Order.id).label("order_count"),
+            func.coalesce(func.sum(Order.total_amount), 0).label("lifetime_value"),
+        ]
+    filters = []
+    if q:
+        # Range scans, so the case-folded column indexes are used.
+        filters.append(
+            or_(
+                User.email_lower.between(q, q + "\uffff"),
+                User.name_lower.between(q, q + "\uffff"),
+            )
+        )
+    query = db.select(*columns).where(User.id > cursor, *filters)
+    if is_admin is not None:
+        query = query.where(User.is_admin.is_(is_admin.lower() in ("1", "true")))
+    if include_stats:
+        query = query.outerjoin(Order, Order.user_id == User.id).group_by(User.id)
+    rows = db.session.execute(query.order_by(User.id).limit(limit + 1)).all()
+
+    user_list = []
+    for row in rows[:limit]:
+        item = {
+            "id": row.id,
+            "name": row.name,
+            "email": row.email,
+            "is_admin": row.is_admin,
+        }
+        if include_stats:
+            item["order_count"] = row.order_count
+            item["lifetime_value"] = row.lifetime_value
+        user_list.append(item)
+    next_cursor = str(rows[limit - 1].id) if len(rows) > limit else None
+    body = {"users": user_list, "next_cursor": next_cursor}
+    if include_counts:
+        # Counted over every match, not just this page, and ignoring is_admin
+        # so the role filter can show how many each choice would list.
+        total, admins = db.session.execute(
+            db.select(
+                func.count(User.id),
+                func.coalesce(func.sum(db.case((User.is_admin, 1), else_=0)), 0),
+            ).where(*filters)
+        ).one()
+        body["counts"] = {
+            "total": total,
+            "admins": admins,
+            "customers": total - admins,
+        }
+    return jsonify(body), 200
 
 
 @admin_bp.route("/categories", methods=["POST"])
@@ -171,33 +346,123 @@ def get_category(category_id):
     )
 
 
+ORDER_FIELDS = Projection(
+    {
+        "id": column(Order.id),
+        "user_id": column(Order.user_id),
+        "user_name": column(User.name.label("user_name")),
+        "user_email": column(User.email.label("user_email")),
+        "total_amount": column(Order.total_amount),
+        "status": column(Order.status),
+        "created_at": computed([Order.created_at], lambda o: o.created_at.isoformat()),
+        "shipping_address": column(Order.shipping_address),
+        "billing_address": column(Order.billing_address),
+    },
+    compact=["id", "user_name", "user_email", "total_amount", "status", "created_at"],
+)
+
+
 @admin_bp.route("/orders", methods=["GET"])
 @jwt_required()
 def get_all_orders():
+    """
+    List every order, newest first.
+
+    Query Parameters:
+    - fields (str): Comma-separated fields to return, or "compact" for what
+      the orders table shows (default: all fields)
+
+    Returns:
+    - orders: The orders
+    - last_event_id: Resume /admin/orders/stream from here to keep the list
+      current
+    """
     current_user_id = int(get_jwt_identity())
     user = User.query.get(current_user_id)
     if not user or not user.is_admin:
         return jsonify({"message": "Admin access required"}), 403
 
-    from sqlalchemy import desc
-    from ...models import Order
+    try:
+        fields = ORDER_FIELDS.parse(request.args.get("fields", type=str))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
 
-    orders = Order.query.order_by(desc(Order.created_at)).all()
-    order_list = [
-        {
-            "id": o.id,
-            "user_id": o.user_id,
-            "user_name": o.user.name,
-            "user_email": o.user.email,
-            "total_amount": o.total_amount,
-            "status": o.status,
-            "created_at": o.created_at.isoformat(),
-            "shipping_address": o.shipping_address,
-            "billing_address": o.billing_address,
-        }
-        for o in orders
-    ]
-    return jsonify({"orders": order_list}), 200
+    from sqlalchemy import desc, select
+
+    # Read first, in the same transaction: a stream opened from this id
+    # replays exactly the changes the list below does not include.
+    last_event_id = latest_event_id()
+    rows = db.session.execute(
+        select(*ORDER_FIELDS.columns(fields))
+        .select_from(Order)
+        .join(User, User.id == Order.user_id)
+        .order_by(desc(Order.created_at))
+    ).all()
+    order_list = [ORDER_FIELDS.serialize(r, fields) for r in rows]
+    return jsonify({"orders": order_list, "last_event_id": last_event_id}), 200
+
+
+@admin_bp.route("/orders/stream-ticket", methods=["POST"])
+@jwt_required()
+def create_order_stream_ticket():
+    """Issue a short-lived ticket for opening /admin/orders/stream."""
+    current_user_id = int(get_jwt_identity())
+    user = User.query.get(current_user_id)
+    if not user or not user.is_admin:
+        return jsonify({"message": "Admin access required"}), 403
+    return (
+        jsonify(
+            {
+                "ticket": issue_stream_ticket(user.id),
+                "expires_in": current_app.config.get("ORDER_STREAM_TICKET_SECONDS", 60),
+            }
+        ),
+        201,
+    )
+
+
+@admin_bp.route("/orders/stream", methods=["GET"])
+def stream_orders():
+    """
+    Server-sent events for new orders and status changes.
+
+    EventSource cannot send headers, so browsers pass a ticket from
+    POST /admin/orders/stream-ticket as ?ticket=; other clients may send
+    the usual bearer token. Reconnects resume from the Last-Event-ID header
+    (or ?last_event_id=); a new stream starts from the latest event.
+    """
+    from flask_jwt_extended import decode_token
+
+    auth = request.headers.get("Authorization", "")
+    if auth.startswith("Bearer "):
+        try:
+            user_id = decode_token(auth[7:])["sub"]
+        except Exception:
+            user_id = None
+    else:
+        user_id = read_stream_ticket(request.args.get("ticket", ""))
+    if user_id is None:
+        return jsonify({"message": "Missing or invalid token"}), 401
+    user = User.query.get(int(user_id))
+    if not user or not user.is_admin:
+        return jsonify({"message": "Admin access required"}), 403
+
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        last_id = int(last_id) if last_id else latest_event_id()
+    except ValueError:
+        return jsonify({"message": "Invalid Last-Event-ID"}), 400
+    db.session.rollback()
+
+    events = stream_events(
+        last_id,
+        max_seconds=current_app.config.get("ORDER_STREAM_MAX_SECONDS", 300),
+    )
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @admin_bp.route("/orders/<int:order_id>", methods=["GET"])
@@ -218,7 +483,11 @@ def get_order_detail(order_id):
             "product_id": oi.product_id,
             "quantity": oi.quantity,
             "price": oi.price,
-            "product": {"name": oi.product.name, "image": oi.product.image},
+            "product": {
+                "name": oi.product.name,
+                "image": oi.product.image,
+                "thumbnail": thumbnail_url(oi.product.image, LINE_ITEM_WIDTH),
+            },
         }
         for oi in order.items
     ]
@@ -260,7 +529,10 @@ def update_order_status(order_id):
         return jsonify({"message": "Invalid status"}), 400
 
     order = Order.query.get_or_404(order_id)
+    previous_status = order.status
     order.status = new_status
+    if new_status != previous_status:
+        record_order_event(order, "status_changed", previous_status=previous_status)
     db.session.commit()
 
     return (
@@ -366,6 +638,39 @@ def delete_product(product_id):
     return jsonify({"message": "Product deleted"}), 200
 
 
+@admin_bp.route("/images", methods=["POST"])
+@jwt_required()
+def upload_image():
+    current_user_id = get_jwt_identity()
+    user = User.query.get(int(current_user_id))
+    if not user or not user.is_admin:
+        return jsonify({"message": "Admin access required"}), 403
+    if not pillow_available():
+        return jsonify({"message": "Image processing is not available"}), 503
+    upload = request.files.get("file")
+    if not upload:
+        return jsonify({"message": "Image file required"}), 400
+    data = upload.read(current_app.config["MAX_IMAGE_BYTES"] + 1)
+    if len(data) > current_app.config["MAX_IMAGE_BYTES"]:
+        return jsonify({"message": "Image too large"}), 413
+    try:
+        base_url = current_app.config.get("MEDIA_URL") or request.host_url + "media"
+        image = store_image(data, base_url)
+    except ImageError as e:
+        return jsonify({"message": str(e)}), 400
+    return (
+        jsonify(
+            {
+                "image": image,
+                "thumbnails": {
+                    width: thumbnail_url(image, width) for width in THUMBNAIL_WIDTHS
+                },
+            }
+        ),
+        201,
+    )
+
+
 @admin_bp.route("/categories", methods=["GET"])
 @jwt_required()
 def get_categories():
@@ -376,7 +681,13 @@ def get_categories():
 
     categories = Category.query.all()
     category_list = [
-        {"id": c.id, "name": c.name, "description": c.description, "image": c.image}
+        {
+            "id": c.id,
+            "name": c.name,
+            "description": c.description,
+            "image": c.image,
+            "thumbnail": thumbnail_url(c.image),
+        }
         for c in categories
     ]
     return jsonify({"categories": category_list}), 200
@@ -411,6 +722,7 @@ def get_products():
             "description": p.description,
             "price": p.price,
             "image": p.image,
+            "thumbnail": thumbnail_url(p.image),
             "category_id": p.category_id,
             "category": {"name": p.category.name} if p.category else None,
         }
@@ -427,3 +739,135 @@ def get_products():
         ),
         200,
     )
+
+
+@admin_bp.route("/products/bulk-price", methods=["POST"])
+@jwt_required()
+def bulk_update_prices():
+    current_user_id = get_jwt_identity()
+    user = User.query.get(int(current_user_id))
+    if not user or not user.is_admin:
+        return jsonify({"message": "Admin access required"}), 403
+    data = request.get_json()
+    percent = data.get("percent")
+    if not isinstance(percent, (int, float)) or percent <= -100:
+        return jsonify({"message": "Valid percent required"}), 400
+    record = enqueue(
+        "bulk_update_prices", percent=percent, category_id=data.get("category_id")
+    )
+    return jsonify({"job_id": record.id, "status": record.status}), 202
+
+
+@job("bulk_update_prices")
+def bulk_update_prices_job(ctx, percent, category_id=None, batch_size=500):
+    """
+    Scale prices by `percent`, committing in batches so progress is visible.
+
+    Each batch commits with a checkpoint of the last id it priced, so a
+    retry after a failure resumes there instead of repricing those rows.
+    """
+    query = Product.query.order_by(Product.id)
+    if category_id:
+        query = query.filter_by(category_id=category_id)
+    total = query.count()
+    factor = 1 + percent / 100
+    checkpoint = ctx.checkpoint or {}
+    done = checkpoint.get("done", 0)
+    last_id = checkpoint.get("last_id", 0)
+    while True:
+        batch = query.filter(Product.id > last_id).limit(batch_size).all()
+        if not batch:
+            break
+        for product in batch:
+            product.price = round(product.price * factor, 2)
+        last_id = batch[-1].id
+        done += len(batch)
+        ctx.set_progress(done / total, checkpoint={"last_id": last_id, "done": done})
+    return {"updated": done}
+
+
+@job("purge_abandoned_carts")
+def purge_abandoned_carts_job(ctx, days=30):
+    """Delete active carts that have not been touched for `days` days."""
+    from datetime import timedelta
+
+    cutoff = utcnow() - timedelta(days=days)
+    carts = ShoppingCart.query.filter(
+        ShoppingCart.status == "active", ShoppingCart.created_at < cutoff
+    ).all()
+    for cart in carts:
+        for item in cart.items:
+            db.session.delete(item)
+        db.session.delete(cart)
+    db.session.commit()
+    return {"deleted": len(carts)}
+
+
+@admin_bp.route("/jobs", methods=["GET"])
+@jwt_required()
+def list_jobs():
+    current_user_id = get_jwt_identity()
+    user = User.query.get(int(current_user_id))
+    if not user or not user.is_admin:
+        return jsonify({"message": "Admin access required"}), 403
+    status = request.args.get("status", type=str)
+    limit = min(request.args.get("limit", 50, type=int), 200)
+    query = Job.query
+    if status:
+        query = query.filter_by(status=status)
+    jobs = query.order_by(Job.id.desc()).limit(limit).all()
+    return jsonify({"jobs": [serialize_job(j) for j in jobs]}), 200
+
+
+@admin_bp.route("/jobs", methods=["POST"])
+@jwt_required()
+def create_job():
+    current_user_id = get_jwt_identity()
+    user = User.query.get(int(current_user_id))
+    if not user or not user.is_admin:
+        return jsonify({"message": "Admin access required"}), 403
+    data = request.get_json()
+    payload = data.get("payload", {})
+    if not isinstance(payload, dict):
+        return jsonify({"message": "Payload must be an object"}), 400
+    try:
+        record = enqueue(data.get("kind"), **payload)
+    except KeyError:
+        return jsonify({"message": "Unknown job kind"}), 400
+    except TypeError as e:
+        return jsonify({"message": f"Invalid payload: {e}"}), 400
+    return jsonify(serialize_job(record)), 202
+
+
+@admin_bp.route("/jobs/<int:job_id>", methods=["GET"])
+@use_primary
+@jwt_required()
+def get_job(job_id):
+    current_user_id = get_jwt_identity()
+    user = User.query.get(int(current_user_id))
+    if not user or not user.is_admin:
+        return jsonify({"message": "Admin access required"}), 403
+    record = Job.query.get_or_404(job_id)
+    return jsonify(serialize_job(record)), 200
+
+
+@admin_bp.route("/profiles", methods=["GET"])
+@jwt_required()
+def list_profiles():
+    current_user_id = get_jwt_identity()
+    user = User.query.get(int(current_user_id))
+    if not user or not user.is_admin:
+        return jsonify({"message": "Admin access required"}), 403
+    return jsonify({"profiles": request_profiler.list_profiles()}), 200
+
+
+@admin_bp.route("/profiles/<name>", methods=["GET"])
+@jwt_required()
+def download_profile(name):
+    current_user_id = get_jwt_identity()
+    user = User.query.get(int(current_user_id))
+    if not user or not user.is_admin:
+        return jsonify({"message": "Admin access required"}), 403
+    if not PROFILE_NAME.match(name):
+        return jsonify({"message": "Invalid profile name"}), 400
+    return send_from_directory(request_profiler.directory, name, as_attachment=True)
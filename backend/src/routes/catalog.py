@@ -0,0 +1,106 @@
+import os
+
+from flask import Blueprint, jsonify, redirect, request, send_from_directory
+from werkzeug.exceptions import NotFound
+
+from ..catalog import catalog_changes
+from ..snapshots import VERSION, catalog_snapshots
+
+catalog_bp = Blueprint("catalog", __name__)
+
+ONE_YEAR = 365 * 24 * 60 * 60
+MAX_CHANGES = 1000
+
+
+@catalog_bp.route("/snapshot", methods=["GET"])
+def get_snapshot():
+    """
+    Describe the current static catalog snapshot.
+
+    Returns:
+    - version: Current snapshot version
+    - generated_at: When it was built
+    - per_page: Page size of the pre-rendered product pages
+    - files: {path: url} for every view, e.g. "categories.json",
+      "products/page-1.json", "categories/3.json",
+      "products/category-3/page-1.json"
+    """
+    pointer = catalog_snapshots.current()
+    if pointer is None:
+        return jsonify({"message": "No snapshot has been built yet"}), 404
+    response = jsonify(
+        {
+            "version": pointer["version"],
+            "generated_at": pointer["generated_at"],
+            "per_page": pointer["per_page"],
+            "files": {
+                path: catalog_snapshots.url(pointer["version"], path)
+                for path in pointer["files"]
+            },
+        }
+    )
+    # Only the pointer changes between builds, so keep it short-lived.
+    response.headers["Cache-Control"] = "public, max-age=30"
+    return response, 200
+
+
+@catalog_bp.route("/snapshot/current/<path:path>", methods=["GET"])
+def get_current_snapshot_file(path):
+    """Redirect to a view in the current snapshot version."""
+    pointer = catalog_snapshots.current()
+    if pointer is None or path not in pointer["files"]:
+        return jsonify({"message": "Not in the current snapshot"}), 404
+    response = redirect(catalog_snapshots.url(pointer["version"], path), code=302)
+    response.headers["Cache-Control"] = "public, max-age=30"
+    return response
+
+
+@catalog_bp.route("/snapshot/<version>/<path:path>", methods=["GET"])
+def get_snapshot_file(version, path):
+    """
+    Serve a snapshot file, gzip'd when the client accepts it.
+
+    A version's files never change, so they can be cached forever. In
+    production point SNAPSHOT_BASE_URL at a static server or CDN instead.
+    """
+    if not VERSION.match(version):
+        return jsonify({"message": "Snapshot file not found"}), 404
+    directory = os.path.join(catalog_snapshots.directory, version)
+    gzipped = "gzip" in request.headers.get("Accept-Encoding", "")
+    try:
+        response = send_from_directory(
+            directory, f"{path}.gz" if gzipped else path, max_age=ONE_YEAR
+        )
+    except NotFound:
+        return jsonify({"message": "Snapshot file not found"}), 404
+    if gzipped:
+        response.headers["Content-Encoding"] = "gzip"
+    response.headers["Content-Type"] = "application/json"
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = f"public, max-age={ONE_YEAR}, immutable"
+    return response
+
+
+@catalog_bp.route("/changes", methods=["GET"])
+def get_changes():
+    """
+    Products and categories created, changed or deleted since a change token.
+
+    Query Parameters:
+    - since (int): `next` from the previous call; 0 or omitted for everything
+    - limit (int): Maximum changes (default: 100, max: 1000)
+
+    Returns:
+    - changes: In change order, each {seq, type: "product"|"category", id,
+      op: "upsert"|"delete"}; upserts carry updated_at and data (as in
+      GET /products and GET /categories/<id>), deletes carry deleted_at
+    - next: Token for the next call
+    - has_more: True if more changes are waiting
+    """
+    since = request.args.get("since", 0, type=int)
+    limit = max(1, min(request.args.get("limit", 100, type=int), MAX_CHANGES))
+    changes, next_token, has_more = catalog_changes(since, limit)
+    return (
+        jsonify({"changes": changes, "next": next_token, "has_more": has_more}),
+        200,
+    )
@@ -0,0 +1,19 @@
+from flask import Blueprint, send_from_directory
+from ..images import media_root
+
+media_bp = Blueprint("media", __name__)
+
+ONE_YEAR = 365 * 24 * 60 * 60
+
+
+@media_bp.route("/<path:filename>", methods=["GET"])
+def get_media(filename):
+    """
+    Serve an uploaded image or thumbnail.
+
+    File names are content hashes, so a URL never changes meaning and can be
+    cached forever.
+    """
+    response = send_from_directory(media_root(), filename, max_age=ONE_YEAR)
+    response.headers["Cache-Control"] = f"public, max-age={ONE_YEAR}, immutable"
+    return response
@@ -0,0 +1,70 @@
+from flask import Blueprint, jsonify, request
+
+from ..cache import catalog_cache
+from ..catalog import categories_payload, category_payload, products_page_payload
+from ..models import Category
+
+page_bp = Blueprint("page", __name__)
+
+MAX_PER_PAGE = 50
+
+
+@page_bp.route("/home", methods=["GET"])
+def get_home_page():
+    """
+    Everything the Home and Products pages load, in one response.
+
+    Query Parameters:
+    - page (int): Product page (default: 1)
+    - per_page (int): Products per page (default: 10, max: 50)
+
+    Returns:
+    - products: As GET /products
+    - categories: As GET /categories
+    """
+    page, per_page = _page_args()
+    key = ("page", "home", page, per_page)
+    bundle = catalog_cache.get(key)
+    if bundle is None:
+        bundle = {
+            "products": products_page_payload(page, per_page),
+            "categories": categories_payload()["categories"],
+        }
+        catalog_cache.set(key, bundle)
+    return jsonify(bundle), 200
+
+
+@page_bp.route("/category/<int:category_id>", methods=["GET"])
+def get_category_page(category_id):
+    """
+    Everything the Category page loads, in one response.
+
+    Query Parameters:
+    - page (int): Product page (default: 1)
+    - per_page (int): Products per page (default: 10, max: 50)
+
+    Returns:
+    - category: As GET /categories/<id>
+    - products: As GET /products?category_id=<id>
+    - categories: As GET /categories
+    """
+    page, per_page = _page_args()
+    key = ("page", "category", category_id, page, per_page)
+    bundle = catalog_cache.get(key)
+    if bundle is None:
+        category = Category.query.get(category_id)
+        if category is None:
+            return jsonify({"message": "Category not found"}), 404
+        bundle = {
+            "category": category_payload(category),
+            "products": products_page_payload(page, per_page, category_id),
+            "categories": categories_payload()["categories"],
+        }
+        catalog_cache.set(key, bundle)
+    return jsonify(bundle), 200
+
+
+def _page_args():
+    page = max(1, request.args.get("page", 1, type=int))
+    per_page = max(1, min(request.args.get("per_page", 10, type=int), MAX_PER_PAGE))
+    return page, per_page
@@ -1,5 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from ...group_commit import group_commit
+from ...idempotency import idempotent
+from ...images import LINE_ITEM_WIDTH, thumbnail_url
 from ...models import db, ShoppingCart, CartItem, Product
 
 
@@ -26,6 +29,7 @@ def get_cart():
                 "name": ci.product.name,
                 "price": ci.product.price,
                 "image_url": ci.product.image,
+                "thumbnail": thumbnail_url(ci.product.image, LINE_ITEM_WIDTH),
             },
         }
         for ci in cart_items
@@ -35,6 +39,7 @@ def get_cart():
 
 @cart_bp.route("/add", methods=["POST", "OPTIONS"])
 @jwt_required()
+@idempotent
 def add_to_cart():
     current_user_id = int(get_jwt_identity())
     data = request.get_json()
@@ -42,16 +47,19 @@ def add_to_cart():
     quantity = data.get("quantity", 1)
     if not product_id:
         return jsonify({"message": "Product ID required"}), 400
-    product = Product.query.get(product_id)
+    body, status = group_commit.run(_add_to_cart, current_user_id, product_id, quantity)
+    return jsonify(body), status
+
+
+def _add_to_cart(user_id, product_id, quantity):
+    product = db.session.get(Product, product_id)
     if not product:
-        return jsonify({"message": "Product not found"}), 404
-    cart = ShoppingCart.query.filter_by(
-        user_id=current_user_id, status="active"
-    ).first()
+        return {"message": "Product not found"}, 404
+    cart = ShoppingCart.query.filter_by(user_id=user_id, status="active").first()
     if not cart:
-        cart = ShoppingCart(user_id=current_user_id)
+        cart = ShoppingCart(user_id=user_id)
         db.session.add(cart)
-        db.session.commit()
+        db.session.flush()
     cart_item = CartItem.query.filter_by(cart_id=cart.id, product_id=product_id).first()
     if cart_item:
         cart_item.quantity += quantity
@@ -63,8 +71,7 @@ def add_to_cart():
             price_at_time=product.price,
         )
         db.session.add(cart_item)
-    db.session.commit()
-    return jsonify({"message": "Added to cart"}), 200
+    return {"message": "Added to cart"}, 200
 
 
 @cart_bp.route("/update/<int:item_id>", methods=["PUT", "OPTIONS"])
@@ -75,13 +82,20 @@ def update_cart_item(item_id):
     quantity = data.get("quantity")
     if quantity is None or quantity <= 0:
         return jsonify({"message": "Valid quantity required"}), 400
-    cart_item = CartItem.query.get_or_404(item_id)
-    cart = cart_item.cart
-    if cart.user_id != current_user_id:
-        return jsonify({"message": "Unauthorized"}), 403
+    body, status = group_commit.run(
+        _update_cart_item, current_user_id, item_id, quantity
+    )
+    return jsonify(body), status
+
+
+def _update_cart_item(user_id, item_id, quantity):
+    cart_item = db.session.get(CartItem, item_id)
+    if not cart_item:
+        return {"message": "Cart item not found"}, 404
+    if cart_item.cart.user_id != user_id:
+        return {"message": "Unauthorized"}, 403
     cart_item.quantity = quantity
-    db.session.commit()
-    return jsonify({"message": "Cart item updated"}), 200
+    return {"message": "Cart item updated"}, 200
 
 
 @cart_bp.route("/remove/<int:item_id>", methods=["DELETE", "OPTIONS"])
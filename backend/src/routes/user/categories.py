@@ -1,4 +1,5 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
+from ...catalog import CATEGORY_FIELDS, categories_payload, category_payload
 from ...models import Category
 
 category_bp = Blueprint("category", __name__)
@@ -9,16 +10,19 @@ def get_categories():
     """
     Get all categories.
 
+    Query Parameters:
+    - fields (str): Comma-separated fields to return, or "compact" (default:
+      all fields)
+
     Returns:
     - categories: List of category objects with id, name, description, image
     """
     try:
-        categories = Category.query.all()
-        category_list = [
-            {"id": c.id, "name": c.name, "description": c.description, "image": c.image}
-            for c in categories
-        ]
-        return jsonify({"categories": category_list}), 200
+        fields = CATEGORY_FIELDS.parse(request.args.get("fields", type=str))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    try:
+        return jsonify(categories_payload(fields)), 200
     except Exception as e:
         return jsonify({"message": "Failed to fetch categories", "error": str(e)}), 500
 
@@ -36,16 +40,6 @@ def get_category(category_id):
     """
     try:
         category = Category.query.get_or_404(category_id)
-        return (
-            jsonify(
-                {
-                    "id": category.id,
-                    "name": category.name,
-                    "description": category.description,
-                    "image": category.image,
-                }
-            ),
-            200,
-        )
+        return jsonify(category_payload(category)), 200
     except Exception as e:
         return jsonify({"message": "Category not found", "error": str(e)}), 404
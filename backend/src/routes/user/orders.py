@@ -1,7 +1,11 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import desc
+from ...group_commit import group_commit
+from ...idempotency import idempotent
+from ...images import LINE_ITEM_WIDTH, thumbnail_url
 from ...models import db, ShoppingCart, Order, OrderItem
+from ...order_events import record_order_event
 
 order_bp = Blueprint("order", __name__)
 
@@ -11,6 +15,7 @@ order_bp = Blueprint("order", __name__)
 
 @order_bp.route("/place", methods=["POST"])
 @jwt_required()
+@idempotent
 def place_order():
     current_user_id = int(get_jwt_identity())
     data = request.get_json()
@@ -18,20 +23,25 @@ def place_order():
     billing_address = data.get("billing_address", shipping_address)
     if not shipping_address:
         return jsonify({"message": "Shipping address required"}), 400
-    cart = ShoppingCart.query.filter_by(
-        user_id=current_user_id, status="active"
-    ).first()
+    body, status = group_commit.run(
+        _place_order, current_user_id, shipping_address, billing_address
+    )
+    return jsonify(body), status
+
+
+def _place_order(user_id, shipping_address, billing_address):
+    cart = ShoppingCart.query.filter_by(user_id=user_id, status="active").first()
     if not cart or not cart.items:
-        return jsonify({"message": "Cart is empty"}), 400
+        return {"message": "Cart is empty"}, 400
     total = sum(ci.quantity * ci.price_at_time for ci in cart.items)
     order = Order(
-        user_id=current_user_id,
+        user_id=user_id,
         total_amount=total,
         shipping_address=shipping_address,
         billing_address=billing_address,
     )
     db.session.add(order)
-    db.session.commit()
+    db.session.flush()
     for ci in cart.items:
         order_item = OrderItem(
             order_id=order.id,
@@ -41,8 +51,13 @@ def place_order():
         )
         db.session.add(order_item)
     cart.status = "checked_out"
-    db.session.commit()
-    return jsonify({"message": "Order placed", "order_id": order.id}), 201
+    record_order_event(
+        order,
+        "created",
+        user_id=user_id,
+        total_amount=order.total_amount,
+    )
+    return {"message": "Order placed", "order_id": order.id}, 201
 
 
 @order_bp.route("/", methods=["GET"])
@@ -81,7 +96,11 @@ def get_order(order_id):
             "product_id": oi.product_id,
             "quantity": oi.quantity,
             "price": oi.price,
-            "product": {"name": oi.product.name, "image": oi.product.image},
+            "product": {
+                "name": oi.product.name,
+                "image": oi.product.image,
+                "thumbnail": thumbnail_url(oi.product.image, LINE_ITEM_WIDTH),
+            },
         }
         for oi in order.items
     ]
@@ -1,8 +1,16 @@
-from flask import Blueprint, request, jsonify
-from ...models import Product
+from flask import Blueprint, abort, request, jsonify
+from sqlalchemy.orm import joinedload
+from ...cache import catalog_cache
+from ...catalog import PRODUCT_FIELDS, products_page_payload
+from ...db_routing import use_replica
+from ...images import DETAIL_WIDTH, thumbnail_url
+from ...models import db, Product, RelatedProduct
+from ...suggest import suggest_index
 
 product_bp = Blueprint("product", __name__)
 
+MAX_BATCH_IDS = 100
+
 
 @product_bp.route("/", methods=["GET"])
 def get_products():
@@ -14,7 +22,14 @@ def get_products():
     - per_page (int): Products per page (default: 10)
     - category_id (int): Filter by category
     - search (str): Search in product name or title (case-insensitive)
+    - fields (str): Comma-separated fields to return, or "compact" (default:
+      all fields)
     """
+    try:
+        fields = PRODUCT_FIELDS.parse(request.args.get("fields", type=str))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
     try:
         # Parse query parameters
         page = request.args.get("page", 1, type=int)
@@ -22,47 +37,8 @@ def get_products():
         category_id = request.args.get("category_id", type=int)
         search = request.args.get("search", type=str)
 
-        # Build query
-        query = Product.query
-
-        # Apply filters
-        if category_id:
-            query = query.filter_by(category_id=category_id)
-
-        if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                (Product.name.ilike(search_term)) | (Product.title.ilike(search_term))
-            )
-
-        # Execute paginated query
-        products = query.paginate(page=page, per_page=per_page, error_out=False)
-
-        # Format response
-        product_list = [
-            {
-                "id": p.id,
-                "name": p.name,
-                "title": p.title,
-                "description": p.description,
-                "price": p.price,
-                "image": p.image,
-                "category_id": p.category_id,
-                "rating": p.rating,
-                "stock_quantity": (p.id * 7) % 20 + 5,  # Hardcoded stock: 5-24 items
-            }
-            for p in products.items
-        ]
-
         return (
-            jsonify(
-                {
-                    "products": product_list,
-                    "total": products.total,
-                    "pages": products.pages,
-                    "current_page": page,
-                }
-            ),
+            jsonify(products_page_payload(page, per_page, category_id, search, fields)),
             200,
         )
 
@@ -79,34 +55,161 @@ def get_product(product_id):
     - product_id (int): Product ID
     """
     try:
-        product = Product.query.get_or_404(product_id)
+        product = load_products([product_id]).get(product_id)
+        if product is None:
+            abort(404)
+        return jsonify(product), 200
+    except Exception as e:
+        return jsonify({"message": "Product not found", "error": str(e)}), 404
+
+
+@product_bp.route("/suggest", methods=["GET"])
+def get_suggestions():
+    """
+    Typeahead suggestions for the search box, served from memory.
+
+    Query Parameters:
+    - q (str): Prefix typed so far (matches the start of any word)
+    - limit (int): Maximum suggestions (default: 8, max: 20)
+
+    Returns:
+    - suggestions: List of {type: "product"|"category", id, text}, most
+      popular first
+    """
+    q = request.args.get("q", "", type=str)
+    limit = max(1, min(request.args.get("limit", 8, type=int), 20))
+    suggest_index.catch_up()
+    return jsonify({"suggestions": suggest_index.suggest(q, limit)}), 200
+
+
+@product_bp.route("/batch", methods=["GET", "POST"])
+@use_replica
+def get_products_batch():
+    """
+    Get several products by ID in one request.
+
+    Query Parameters (GET):
+    - ids (str): Comma-separated product IDs
 
-        # Generate a pseudo-random rating based on product ID for consistency
-        # But make it more realistic with some variation
-        base_rating = (product_id * 0.37) % 3  # 0-3 range
-        rating = round(3.5 + base_rating, 1)  # 3.5 to 4.5 range
-        if rating > 5.0:
-            rating = 5.0
+    JSON Body (POST):
+    - ids (list[int]): Product IDs, for lists too long for a URL
 
+    Returns:
+    - products: Product objects in the requested order
+    - missing: Requested IDs that do not exist
+    """
+    if request.method == "POST":
+        raw_ids = (request.get_json(silent=True) or {}).get("ids", [])
+    else:
+        raw_ids = [i for i in request.args.get("ids", "").split(",") if i.strip()]
+    try:
+        if not isinstance(raw_ids, list):
+            raise TypeError
+        ids = list(dict.fromkeys(int(i) for i in raw_ids))
+    except (TypeError, ValueError):
+        return jsonify({"message": "ids must be integers"}), 400
+    if not ids:
+        return jsonify({"message": "ids required"}), 400
+    if len(ids) > MAX_BATCH_IDS:
         return (
-            jsonify(
-                {
-                    "id": product.id,
-                    "name": product.name,
-                    "title": product.title,
-                    "description": product.description,
-                    "price": product.price,
-                    "image": product.image,
-                    "category_id": product.category_id,
-                    "category_name": (
-                        product.category.name if product.category else None
-                    ),
-                    "rating": rating,
-                    "stock_quantity": (product_id * 7) % 20
-                    + 5,  # Hardcoded stock: 5-24 items per product
-                }
-            ),
-            200,
+            jsonify({"message": f"At most {MAX_BATCH_IDS} ids per request"}),
+            400,
         )
-    except Exception as e:
-        return jsonify({"message": "Product not found", "error": str(e)}), 404
+
+    found = load_products(ids)
+    return (
+        jsonify(
+            {
+                "products": [found[i] for i in ids if i in found],
+                "missing": [i for i in ids if i not in found],
+            }
+        ),
+        200,
+    )
+
+
+@product_bp.route("/<int:product_id>/related", methods=["GET"])
+def get_related_products(product_id):
+    """
+    Products frequently bought together with this one.
+
+    Query Parameters:
+    - limit (int): Maximum products (default: 6, max: 20)
+    """
+    limit = max(1, min(request.args.get("limit", 6, type=int), 20))
+    rows = db.session.execute(
+        db.select(
+            Product.id,
+            Product.name,
+            Product.title,
+            Product.price,
+            Product.image,
+            Product.category_id,
+            RelatedProduct.score,
+        )
+        .join(RelatedProduct, RelatedProduct.related_product_id == Product.id)
+        .where(RelatedProduct.product_id == product_id)
+        .order_by(RelatedProduct.rank)
+        .limit(limit)
+    ).all()
+    related = [
+        {
+            "id": r.id,
+            "name": r.name,
+            "title": r.title,
+            "price": r.price,
+            "image": r.image,
+            "thumbnail": thumbnail_url(r.image),
+            "category_id": r.category_id,
+            "score": r.score,
+        }
+        for r in rows
+    ]
+    return jsonify({"products": related}), 200
+
+
+def serialize_product(product):
+    # Generate a pseudo-random rating based on product ID for consistency
+    # But make it more realistic with some variation
+    base_rating = (product.id * 0.37) % 3  # 0-3 range
+    rating = round(3.5 + base_rating, 1)  # 3.5 to 4.5 range
+    if rating > 5.0:
+        rating = 5.0
+
+    return {
+        "id": product.id,
+        "name": product.name,
+        "title": product.title,
+        "description": product.description,
+        "price": product.price,
+        "image": product.image,
+        "thumbnail": thumbnail_url(product.image, DETAIL_WIDTH),
+        "category_id": product.category_id,
+        "category_name": product.category.name if product.category else None,
+        "rating": rating,
+        "stock_quantity": (product.id * 7) % 20
+        + 5,  # Hardcoded stock: 5-24 items per product
+    }
+
+
+def load_products(ids):
+    """
+    Return {id: serialized product} for the ids that exist.
+
+    Served from the catalog cache where possible; misses are fetched in one
+    IN query with their categories eager-loaded.
+    """
+    found = catalog_cache.get_many(("product", i) for i in ids)
+    found = {key[1]: value for key, value in found.items()}
+    misses = [i for i in ids if i not in found]
+    if misses:
+        products = (
+            Product.query.options(joinedload(Product.category))
+            .filter(Product.id.in_(misses))
+            .all()
+        )
+        for product in products:
+            data = serialize_product(product)
+            catalog_cache.set(("product", product.id), data)
+            found[product.id] = data
+    return found
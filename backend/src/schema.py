@@ -0,0 +1,66 @@
+from sqlalchemy import func, insert, inspect, select, update
+
+from .models import db, CatalogSequence, Category, Product, User
+
+
+def upgrade_schema():
+    """
+    Bring an existing database up to date with the models.
+
+    db.create_all() only creates missing tables, so columns and indexes
+    added to models later are applied here, followed by any backfills they
+    need. Only nullable columns can be added this way.
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.exec_driver_sql(
+                    f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" '
+                    f"{column_type}"
+                )
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+    _backfill()
+    _backfill_change_seqs()
+
+
+def _backfill():
+    users = User.query.filter(User.email_lower.is_(None)).all()
+    for user in users:
+        user.email_lower = user.email.casefold()
+        user.name_lower = user.name.casefold()
+    if users:
+        db.session.commit()
+
+
+def _backfill_change_seqs():
+    # Rows from before delta sync get distinct sequence numbers in one pass:
+    # products first, by id, then categories after the highest product id.
+    with db.engine.begin() as conn:
+        value = conn.execute(
+            select(CatalogSequence.value).where(CatalogSequence.id == 1)
+        ).scalar()
+        if value is None:
+            value = 0
+            conn.execute(insert(CatalogSequence).values(id=1, value=0))
+        top_product = conn.execute(select(func.max(Product.id))).scalar() or 0
+        for model, base in ((Product, value), (Category, value + top_product)):
+            conn.execute(
+                update(model)
+                .where(model.change_seq.is_(None))
+                .values(change_seq=model.id + base, updated_at=func.now())
+            )
+        top = max(
+            conn.execute(select(func.max(Product.change_seq))).scalar() or 0,
+            conn.execute(select(func.max(Category.change_seq))).scalar() or 0,
+        )
+        if top > value:
+            conn.execute(
+                update(CatalogSequence).where(CatalogSequence.id == 1).values(value=top)
+            )
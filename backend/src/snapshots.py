@@ -0,0 +1,148 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+
+import click
+from flask import current_app
+
+from .cache import catalog_changed
+from .catalog import categories_payload, category_payload, products_page_payload
+from .jobs import job, schedule
+from .models import Category
+
+POINTER = "current.json"
+VERSION = re.compile(r"^\d{8}T\d{6}-[0-9a-f]{8}$")
+
+
+class CatalogSnapshots:
+    """
+    Pre-rendered copies of the public catalog views as static JSON files.
+
+    Each build writes every view into a new version directory, as plain
+    .json and gzip'd .json.gz (for nginx gzip_static or a CDN), then swaps
+    the current.json pointer with os.replace, so readers only ever see a
+    complete version. File contents never change under a version, so they
+    can be cached forever; only the small pointer needs revalidating. The
+    last SNAPSHOT_KEEP versions stay on disk for clients still reading them.
+    """
+
+    def __init__(self):
+        self.directory = None
+        self.pages = 3
+        self.per_page = 10
+        self.keep = 3
+        self.base_url = None
+
+    def init_app(self, app):
+        self.directory = os.path.abspath(
+            app.config.get("SNAPSHOT_DIR", "instance/snapshots")
+        )
+        self.pages = app.config.get("SNAPSHOT_PAGES", self.pages)
+        self.per_page = app.config.get("SNAPSHOT_PER_PAGE", self.per_page)
+        self.keep = app.config.get("SNAPSHOT_KEEP", self.keep)
+        self.base_url = app.config.get("SNAPSHOT_BASE_URL")
+        os.makedirs(self.directory, exist_ok=True)
+
+        @app.cli.command("build-snapshot")
+        def build_snapshot_command():
+            """Write a new static catalog snapshot and make it current."""
+            pointer = self.build()
+            click.echo(f"Snapshot {pointer['version']}: {len(pointer['files'])} files")
+
+    def views(self):
+        """Yield (path, payload) for every view in a snapshot."""
+        yield "categories.json", categories_payload()
+        yield from self._product_pages("products", None)
+        for category in Category.query.order_by(Category.id).all():
+            yield f"categories/{category.id}.json", category_payload(category)
+            yield from self._product_pages(
+                f"products/category-{category.id}", category.id
+            )
+
+    def _product_pages(self, prefix, category_id):
+        for page in range(1, self.pages + 1):
+            payload = products_page_payload(page, self.per_page, category_id)
+            yield f"{prefix}/page-{page}.json", payload
+            if page >= payload["pages"]:
+                break
+
+    def build(self):
+        """Render every view and make it the current version; returns the pointer."""
+        rendered = {
+            path: json.dumps(payload, separators=(",", ":")).encode()
+            for path, payload in self.views()
+        }
+        digest = hashlib.sha256()
+        for path in sorted(rendered):
+            digest.update(path.encode() + b"\0" + rendered[path] + b"\0")
+        digest = digest.hexdigest()
+
+        current = self.current()
+        if current and current["digest"] == digest:
+            return current
+
+        version = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{digest[:8]}"
+        staging = os.path.join(self.directory, f".{version}.tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        for path, body in rendered.items():
+            target = os.path.join(staging, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                f.write(body)
+            with open(f"{target}.gz", "wb") as f:
+                f.write(gzip.compress(body, compresslevel=9, mtime=0))
+        os.rename(staging, os.path.join(self.directory, version))
+
+        pointer = {
+            "version": version,
+            "digest": digest,
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "per_page": self.per_page,
+            "files": sorted(rendered),
+        }
+        tmp = os.path.join(self.directory, f".{POINTER}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(pointer, f)
+        os.replace(tmp, os.path.join(self.directory, POINTER))
+        self._prune(version)
+        return pointer
+
+    def current(self):
+        try:
+            with open(os.path.join(self.directory, POINTER)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def url(self, version, path):
+        if self.base_url:
+            return f"{self.base_url.rstrip('/')}/{version}/{path}"
+        return f"/catalog/snapshot/{version}/{path}"
+
+    def _prune(self, current_version):
+        versions = sorted(
+            name for name in os.listdir(self.directory) if VERSION.match(name)
+        )
+        for name in versions[: -self.keep]:
+            if name != current_version:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+
+catalog_snapshots = CatalogSnapshots()
+
+
+@job("build_catalog_snapshot")
+def build_snapshot_job(ctx):
+    pointer = catalog_snapshots.build()
+    return {"version": pointer["version"], "files": len(pointer["files"])}
+
+
+@catalog_changed.connect
+def _schedule_snapshot(sender, **changes):
+    delay = current_app.config.get("SNAPSHOT_DEBOUNCE_SECONDS")
+    if delay is not None:
+        schedule("build_catalog_snapshot", delay=delay)
@@ -0,0 +1,261 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from .cache import catalog_changed
+from .models import (
+    db,
+    CatalogSequence,
+    CatalogTombstone,
+    Category,
+    OrderItem,
+    Product,
+)
+
+# Results kept per prefix of up to MEMO_PREFIX_LENGTH characters. Those
+# prefixes match most of the catalog, so they are ranked over every match
+# once and then served from the memo until an entry under them changes.
+MEMO_PREFIX_LENGTH = 2
+MEMO_SIZE = 20
+
+
+def _terms(text):
+    """Every word-start suffix, so "Running Shoes" matches "run" and "sho"."""
+    words = (text or "").casefold().split()
+    return {" ".join(words[i:]) for i in range(len(words))}
+
+
+class SuggestIndex:
+    """
+    In-memory prefix index over product names/titles and category names.
+
+    Keys are kept in a sorted list of (term, kind, id) tuples and searched
+    with bisect. Built once at startup and patched on catalog commits, so
+    lookups never touch the database. Commits made by other processes are
+    picked up by catch_up(), which also re-reads popularity (units sold)
+    every SUGGEST_POPULARITY_SECONDS.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._entries = {}
+        self._memo = {}
+        self._seq = 0
+        self._checked_at = 0.0
+        self._scored_at = 0.0
+        self._lock = threading.Lock()
+        self._catch_up_lock = threading.Lock()
+
+    def build(self):
+        seq = self._catalog_seq()
+        popularity, category_popularity = self._popularity()
+        products = db.session.execute(
+            select(Product.id, Product.name, Product.title)
+        ).all()
+        categories = db.session.execute(select(Category.id, Category.name)).all()
+
+        entries = {}
+        for p in products:
+            entries[("product", p.id)] = self._entry(
+                "product", p.id, p.name, [p.name, p.title], popularity.get(p.id, 0)
+            )
+        for c in categories:
+            entries[("category", c.id)] = self._entry(
+                "category", c.id, c.name, [c.name], category_popularity.get(c.id, 0)
+            )
+        keys = sorted(
+            (term, kind, entry_id)
+            for (kind, entry_id), entry in entries.items()
+            for term in entry["terms"]
+        )
+        with self._lock:
+            self._entries = entries
+            self._keys = keys
+            self._memo = {}
+            self._seq = seq
+            self._checked_at = self._scored_at = time.monotonic()
+
+    def catch_up(self):
+        """
+        Apply catalog commits this process has not seen, such as those made
+        in another gunicorn worker, and refresh popularity once it is older
+        than SUGGEST_POPULARITY_SECONDS. Checks at most every
+        SUGGEST_REFRESH_SECONDS; only one caller at a time does the work.
+        """
+        interval = current_app.config.get("SUGGEST_REFRESH_SECONDS", 5)
+        now = time.monotonic()
+        if now - self._checked_at < interval:
+            return
+        if not self._catch_up_lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = now
+            seq = self._catalog_seq()
+            if seq != self._seq:
+                self._apply_changes(self._seq)
+                self._seq = seq
+            max_age = current_app.config.get("SUGGEST_POPULARITY_SECONDS", 300)
+            if now - self._scored_at >= max_age:
+                self._rescore()
+                self._scored_at = now
+        finally:
+            self._catch_up_lock.release()
+
+    def _apply_changes(self, since):
+        products = db.session.execute(
+            select(Product.id, Product.name, Product.title).where(
+                Product.change_seq > since
+            )
+        ).all()
+        categories = db.session.execute(
+            select(Category.id, Category.name).where(Category.change_seq > since)
+        ).all()
+        deleted = db.session.execute(
+            select(CatalogTombstone.kind, CatalogTombstone.entity_id).where(
+                CatalogTombstone.change_seq > since
+            )
+        ).all()
+        for row in products:
+            self.upsert("product", row.id, row.name, [row.name, row.title])
+        for row in categories:
+            self.upsert("category", row.id, row.name, [row.name])
+        for row in deleted:
+            self.remove(row.kind, row.entity_id)
+
+    def _rescore(self):
+        popularity, category_popularity = self._popularity()
+        scores = {"product": popularity, "category": category_popularity}
+        with self._lock:
+            for (kind, entry_id), entry in self._entries.items():
+                entry["score"] = scores[kind].get(entry_id, 0)
+            self._memo = {}
+
+    @staticmethod
+    def _popularity():
+        """Units sold per product id and per category id."""
+        sold = func.sum(OrderItem.quantity)
+        products = db.session.execute(
+            select(OrderItem.product_id, sold).group_by(OrderItem.product_id)
+        ).all()
+        categories = db.session.execute(
+            select(Product.category_id, sold)
+            .join(Product, Product.id == OrderItem.product_id)
+            .group_by(Product.category_id)
+        ).all()
+        return dict(products), dict(categories)
+
+    def suggest(self, prefix, limit=8):
+        prefix = prefix.casefold().strip()
+        if not prefix:
+            return []
+        with self._lock:
+            if len(prefix) <= MEMO_PREFIX_LENGTH:
+                ranked = self._memo.get(prefix)
+                if ranked is None:
+                    ranked = self._memo[prefix] = self._rank(prefix, MEMO_SIZE)
+            else:
+                ranked = self._rank(prefix, limit)
+        return [
+            {"type": e["type"], "id": e["id"], "text": e["text"]}
+            for e in ranked[:limit]
+        ]
+
+    def _rank(self, prefix, limit):
+        # Every key under the prefix is considered, so the top results are
+        # the most popular matches rather than the alphabetically first.
+        found = {}
+        i = bisect_left(self._keys, (prefix,))
+        while i < len(self._keys) and self._keys[i][0].startswith(prefix):
+            _, kind, entry_id = self._keys[i]
+            found[(kind, entry_id)] = self._entries[(kind, entry_id)]
+            i += 1
+        return heapq.nsmallest(
+            limit,
+            found.values(),
+            key=lambda e: (-e["score"], len(e["text"]), e["text"], e["type"], e["id"]),
+        )
+
+    def upsert(self, kind, entry_id, text, fields):
+        with self._lock:
+            old = self._entries.get((kind, entry_id))
+            score = old["score"] if old else 0
+            self._remove_locked(kind, entry_id)
+            entry = self._entry(kind, entry_id, text, fields, score)
+            self._entries[(kind, entry_id)] = entry
+            for term in entry["terms"]:
+                insort(self._keys, (term, kind, entry_id))
+            self._forget_memo(entry["terms"])
+
+    def remove(self, kind, entry_id):
+        with self._lock:
+            self._remove_locked(kind, entry_id)
+
+    def _remove_locked(self, kind, entry_id):
+        entry = self._entries.pop((kind, entry_id), None)
+        if entry is None:
+            return
+        for term in entry["terms"]:
+            i = bisect_left(self._keys, (term, kind, entry_id))
+            if i < len(self._keys) and self._keys[i] == (term, kind, entry_id):
+                del self._keys[i]
+        self._forget_memo(entry["terms"])
+
+    def _forget_memo(self, terms):
+        for term in terms:
+            for n in range(1, MEMO_PREFIX_LENGTH + 1):
+                self._memo.pop(term[:n], None)
+
+    @staticmethod
+    def _catalog_seq():
+        return (
+            db.session.execute(
+                select(CatalogSequence.value).where(CatalogSequence.id == 1)
+            ).scalar()
+            or 0
+        )
+
+    @staticmethod
+    def _entry(kind, entry_id, text, fields, score):
+        terms = set()
+        for field in fields:
+            terms |= _terms(field)
+        return {
+            "type": kind,
+            "id": entry_id,
+            "text": text,
+            "score": score,
+            "terms": terms,
+        }
+
+
+suggest_index = SuggestIndex()
+
+
+@catalog_changed.connect
+def _apply_catalog_changes(sender, products, categories, deleted_products):
+    # Runs after commit, when the ORM session can no longer emit SQL, so the
+    # changed rows are read on a separate connection.
+    with db.engine.connect() as conn:
+        if products:
+            rows = conn.execute(
+                select(Product.id, Product.name, Product.title).where(
+                    Product.id.in_(products)
+                )
+            ).all()
+            for row in rows:
+                suggest_index.upsert("product", row.id, row.name, [row.name, row.title])
+        if categories:
+            rows = conn.execute(
+                select(Category.id, Category.name).where(Category.id.in_(categories))
+            ).all()
+            present = {row.id for row in rows}
+            for row in rows:
+                suggest_index.upsert("category", row.id, row.name, [row.name])
+            for category_id in categories - present:
+                suggest_index.remove("category", category_id)
+    for product_id in deleted_products:
+        suggest_index.remove("product", product_id)
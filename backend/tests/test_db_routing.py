@@ -0,0 +1,120 @@
+"""
+Read/write routing against two local SQLite files, a primary and a replica.
+
+The replica is a copy of the primary taken after setup, so rows written to
+only one of the files show which engine served a request.
+"""
+
+import importlib
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def databases(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("routing")
+    return tmp / "primary.db", tmp / "replica.db"
+
+
+@pytest.fixture(scope="module")
+def app(databases):
+    primary, replica = databases
+    monkeypatch = pytest.MonkeyPatch()
+    monkeypatch.chdir(primary.parent)
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{primary}")
+    monkeypatch.setenv("DATABASE_READ_URLS", f"sqlite:///{replica}")
+    monkeypatch.setenv("JOBS_IN_PROCESS_THREADS", "0")
+    main = importlib.import_module("main")
+    from src.models import db, Category
+
+    with main.app.app_context():
+        db.session.add(Category(name="Shared"))
+        db.session.commit()
+        db.engine.dispose()
+
+    with sqlite3.connect(primary) as source, sqlite3.connect(replica) as target:
+        source.backup(target)
+    with sqlite3.connect(replica) as conn:
+        conn.execute(
+            "INSERT INTO product (name, title, price, category_id, change_seq) "
+            "VALUES ('Replica Only', 'Replica Only', 1.0, 1, 0)"
+        )
+
+    yield main.app
+    monkeypatch.undo()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_headers(app):
+    from flask_jwt_extended import create_access_token
+    from src.models import User
+
+    with app.app_context():
+        admin = User.query.filter_by(email="admin@example.com").one()
+        token = create_access_token(identity=str(admin.id))
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _product_names(path):
+    with sqlite3.connect(path) as conn:
+        return {name for (name,) in conn.execute("SELECT name FROM product")}
+
+
+def _create_product(client, headers, name):
+    response = client.post(
+        "/admin/products",
+        json={"name": name, "title": name, "price": 5, "category_id": 1},
+        headers=headers,
+    )
+    assert response.status_code == 201
+
+
+def _admin_search(client, headers, name):
+    response = client.get(f"/admin/products?search={name}", headers=headers)
+    assert response.status_code == 200
+    return [p["name"] for p in response.json["products"]]
+
+
+def test_get_reads_replica(client):
+    response = client.get("/products/?search=Replica")
+    assert response.status_code == 200
+    assert [p["name"] for p in response.json["products"]] == ["Replica Only"]
+
+
+def test_post_read_marked_use_replica_reads_replica(client, databases):
+    _, replica = databases
+    with sqlite3.connect(replica) as conn:
+        (product_id,) = conn.execute(
+            "SELECT id FROM product WHERE name = 'Replica Only'"
+        ).fetchone()
+    response = client.post("/products/batch", json={"ids": [product_id]})
+    assert response.status_code == 200
+    assert [p["name"] for p in response.json["products"]] == ["Replica Only"]
+
+
+def test_write_goes_to_primary(client, admin_headers, databases):
+    primary, replica = databases
+    _create_product(client, admin_headers, "Written")
+    assert "Written" in _product_names(primary)
+    assert "Written" not in _product_names(replica)
+
+
+def test_reads_stick_to_primary_after_own_write(client, admin_headers, monkeypatch):
+    from src.db_routing import read_replicas
+
+    _create_product(client, admin_headers, "Sticky")
+
+    # The writer sees its own write from the primary...
+    assert _admin_search(client, admin_headers, "Sticky") == ["Sticky"]
+    # ...while anonymous reads still go to the replica.
+    assert client.get("/products/?search=Sticky").json["products"] == []
+
+    # Once the sticky window has passed, the writer reads the replica again.
+    monkeypatch.setattr(read_replicas, "sticky_seconds", 0)
+    assert _admin_search(client, admin_headers, "Sticky") == []
@@ -5,7 +5,7 @@ import api from '../utils/api';
 const ProductCard = ({ product }) => {
   const navigate = useNavigate();
   const [addingToCart, setAddingToCart] = useState(false);
-  const imageUrl = product.image || 'https://via.placeholder.com/300x200?text=No+Image';
+  const imageUrl = product.thumbnail || product.image || 'https://via.placeholder.com/300x200?text=No+Image';
 
   const handleAddToCart = async (e) => {
     e.preventDefault();
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import api from '../utils/api';
+import { subscribeToOrderEvents } from '../utils/orderEvents';
 import AdminLayout from '../components/AdminLayout';
 
 const AdminDashboard = () => {
@@ -22,9 +23,53 @@ const AdminDashboard = () => {
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    fetchDashboardStats();
+    let unsubscribe = null;
+    let cancelled = false;
+    fetchDashboardStats().then((lastEventId) => {
+      if (!cancelled && lastEventId !== undefined) {
+        // The stats come from a periodic job; order events since it ran
+        // are applied here instead of recomputing them on the server.
+        unsubscribe = subscribeToOrderEvents(lastEventId, applyOrderEvent);
+      }
+    });
+    return () => {
+      cancelled = true;
+      if (unsubscribe) unsubscribe();
+    };
   }, []);
 
+  const ACTIVE_STATUSES = ['pending', 'confirmed', 'shipped'];
+  const REVENUE_STATUSES = ['confirmed', 'shipped', 'delivered'];
+
+  const applyOrderEvent = (event) => {
+    const { order } = event;
+    const previous = event.type === 'created' ? null : event.data.previous_status;
+    const change = (statuses) =>
+      (statuses.includes(event.status) ? 1 : 0) - (statuses.includes(previous) ? 1 : 0);
+    const revenue = change(REVENUE_STATUSES) * (order.total_amount || 0);
+    const thisMonth = new Date(order.created_at).getMonth() === new Date().getMonth();
+
+    setDashboardData(prev => {
+      if (event.type === 'created' && prev.recent_orders.some(o => o.id === order.id)) {
+        return prev;
+      }
+      const recentOrders = event.type === 'created'
+        ? [order, ...prev.recent_orders].slice(0, 5)
+        : prev.recent_orders.map(o => (o.id === order.id ? { ...o, status: event.status } : o));
+      return {
+        ...prev,
+        stats: {
+          ...prev.stats,
+          total_orders: prev.stats.total_orders + (event.type === 'created' ? 1 : 0),
+          active_orders: prev.stats.active_orders + change(ACTIVE_STATUSES),
+          total_revenue: (prev.stats.total_revenue || 0) + revenue,
+          monthly_revenue: (prev.stats.monthly_revenue || 0) + (thisMonth ? revenue : 0),
+        },
+        recent_orders: recentOrders,
+      };
+    });
+  };
+
   const fetchDashboardStats = async () => {
     try {
       const token = localStorage.getItem('access_token');
@@ -35,6 +80,7 @@ const AdminDashboard = () => {
 
       const response = await api.get('/admin/dashboard');
       setDashboardData(response.data);
+      return response.data.last_event_id ?? null;
     } catch (error) {
       console.error('Error fetching dashboard stats:', error);
       if (error.response?.status === 401) {
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import api from '../utils/api';
+import { subscribeToOrderEvents } from '../utils/orderEvents';
 import AdminLayout from '../components/AdminLayout';
 
 const AdminOrders = () => {
@@ -9,9 +10,34 @@ const AdminOrders = () => {
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    fetchOrders();
+    let unsubscribe = null;
+    let cancelled = false;
+    fetchOrders().then((lastEventId) => {
+      if (!cancelled && lastEventId !== undefined) {
+        // Load the list once, then apply only the changes since.
+        unsubscribe = subscribeToOrderEvents(lastEventId, applyOrderEvent);
+      }
+    });
+    return () => {
+      cancelled = true;
+      if (unsubscribe) unsubscribe();
+    };
   }, []);
 
+  const applyOrderEvent = (event) => {
+    setOrders(prev => {
+      if (event.type === 'created') {
+        if (prev.some(order => order.id === event.order_id)) return prev;
+        return [event.order, ...prev];
+      }
+      return prev.map(order =>
+        order.id === event.order_id
+          ? { ...order, status: event.status }
+          : order
+      );
+    });
+  };
+
   const fetchOrders = async () => {
     try {
       const token = localStorage.getItem('access_token');
@@ -20,8 +46,9 @@ const AdminOrders = () => {
         return;
       }
 
-      const response = await api.get('/admin/orders');
+      const response = await api.get('/admin/orders', { params: { fields: 'compact' } });
       setOrders(response.data.orders || []);
+      return response.data.last_event_id;
     } catch (error) {
       console.error('Error fetching orders:', error);
       if (error.response?.status === 401) {
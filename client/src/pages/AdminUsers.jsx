@@ -6,13 +6,19 @@ import AdminLayout from '../components/AdminLayout';
 const AdminUsers = () => {
   const navigate = useNavigate();
   const [users, setUsers] = useState([]);
+  const [counts, setCounts] = useState({ total: 0, admins: 0, customers: 0 });
+  const [nextCursor, setNextCursor] = useState(null);
+  const [search, setSearch] = useState('');
+  const [roleFilter, setRoleFilter] = useState('');
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
-    fetchUsers();
-  }, []);
+    const timer = setTimeout(() => fetchUsers(), search ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [search, roleFilter]);
 
-  const fetchUsers = async () => {
+  const fetchUsers = async (cursor = null) => {
     try {
       const token = localStorage.getItem('access_token');
       if (!token) {
@@ -20,8 +26,24 @@ const AdminUsers = () => {
         return;
       }
 
-      const response = await api.get('/admin/users');
-      setUsers(response.data.users || []);
+      // The endpoint returns one page plus next_cursor; counts come from
+      // the server so they cover every matching user, not just this page.
+      const params = {};
+      if (search.trim()) params.q = search.trim();
+      if (roleFilter) params.is_admin = roleFilter === 'admin';
+      if (cursor) {
+        params.cursor = cursor;
+      } else {
+        params.include_counts = true;
+      }
+
+      const response = await api.get('/admin/users', { params });
+      const page = response.data.users || [];
+      setUsers(prev => (cursor ? [...prev, ...page] : page));
+      setNextCursor(response.data.next_cursor || null);
+      if (response.data.counts) {
+        setCounts(response.data.counts);
+      }
     } catch (error) {
       console.error('Error fetching users:', error);
       if (error.response?.status === 401) {
@@ -29,9 +51,15 @@ const AdminUsers = () => {
       }
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
+  const loadMore = () => {
+    setLoadingMore(true);
+    fetchUsers(nextCursor);
+  };
+
   const toggleAdminStatus = async (userId, currentStatus) => {
     if (window.confirm(`Are you sure you want to ${currentStatus ? 'remove' : 'grant'} admin privileges for this user?`)) {
       try {
@@ -56,9 +84,6 @@ const AdminUsers = () => {
     );
   }
 
-  const adminCount = users.filter(user => user.is_admin).length;
-  const regularUserCount = users.length - adminCount;
-
   return (
     <AdminLayout>
       <div className="max-w-7xl mx-auto">
@@ -80,7 +105,7 @@ const AdminUsers = () => {
               </div>
               <div className="ml-4">
                 <p className="text-sm font-medium text-blue-600">Total Users</p>
-                <p className="text-2xl font-bold text-blue-900">{users.length}</p>
+                <p className="text-2xl font-bold text-blue-900">{counts.total}</p>
               </div>
             </div>
           </div>
@@ -94,7 +119,7 @@ const AdminUsers = () => {
               </div>
               <div className="ml-4">
                 <p className="text-sm font-medium text-green-600">Regular Users</p>
-                <p className="text-2xl font-bold text-green-900">{regularUserCount}</p>
+                <p className="text-2xl font-bold text-green-900">{counts.customers}</p>
               </div>
             </div>
           </div>
@@ -108,12 +133,32 @@ const AdminUsers = () => {
               </div>
               <div className="ml-4">
                 <p className="text-sm font-medium text-purple-600">Admins</p>
-                <p className="text-2xl font-bold text-purple-900">{adminCount}</p>
+                <p className="text-2xl font-bold text-purple-900">{counts.admins}</p>
               </div>
             </div>
           </div>
         </div>
 
+        {/* Filters */}
+        <div className="flex flex-col md:flex-row gap-4 mb-6">
+          <input
+            type="text"
+            value={search}
+            onChange={(e) => setSearch(e.target.value)}
+            placeholder="Search by name or email prefix..."
+            className="flex-1 px-4 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+          />
+          <select
+            value={roleFilter}
+            onChange={(e) => setRoleFilter(e.target.value)}
+            className="px-4 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+          >
+            <option value="">All roles</option>
+            <option value="admin">Admins</option>
+            <option value="customer">Regular users</option>
+          </select>
+        </div>
+
         {/* Users Table */}
         <div className="bg-white rounded-lg shadow-md overflow-hidden">
           {users.length === 0 ? (
@@ -201,6 +246,17 @@ const AdminUsers = () => {
                   </tbody>
                 </table>
               </div>
+              {nextCursor && (
+                <div className="px-6 py-4 border-t border-gray-200 text-center">
+                  <button
+                    onClick={loadMore}
+                    disabled={loadingMore}
+                    className="px-4 py-2 text-sm font-medium text-blue-600 bg-blue-50 rounded-md hover:bg-blue-100 disabled:opacity-50"
+                  >
+                    {loadingMore ? 'Loading...' : 'Load more users'}
+                  </button>
+                </div>
+              )}
             </>
           )}
         </div>
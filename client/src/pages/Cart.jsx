@@ -113,7 +113,7 @@ const Cart = () => {
                 >
                
                   <img
-                    src={item.product.image_url || 'https://via.placeholder.com/100x100?text=No+Image'}
+                    src={item.product.thumbnail || item.product.image_url || 'https://via.placeholder.com/100x100?text=No+Image'}
                     alt={item.product.name}
                     className="w-20 h-20 object-cover rounded-lg mr-4"
                     onError={(e) => {
@@ -54,7 +54,7 @@ const Categories = () => {
               <div className="h-48 overflow-hidden">
                 {category.image ? (
                   <img
-                    src={category.image}
+                    src={category.thumbnail || category.image}
                     alt={category.name}
                     className="w-full h-full object-cover group-hover:scale-110 transition-transform duration-300"
                     onError={(e) => {
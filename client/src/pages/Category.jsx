@@ -15,13 +15,10 @@ const Category = () => {
 
   const fetchCategoryData = async () => {
     try {
-      const [categoryResponse, productsResponse] = await Promise.all([
-        publicApi.get(`/categories/${categoryId}`),
-        publicApi.get(`/products?category_id=${categoryId}`)
-      ]);
+      const response = await publicApi.get(`/pages/category/${categoryId}`);
 
-      setCategory(categoryResponse.data);
-      setProducts(productsResponse.data.products);
+      setCategory(response.data.category);
+      setProducts(response.data.products.products);
     } catch (error) {
       console.error('Error fetching category data:', error);
       setCategory(null);
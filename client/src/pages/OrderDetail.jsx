@@ -171,7 +171,7 @@ const OrderDetail = () => {
                 <div className="flex items-center">
                   {/* Product Image */}
                   <img
-                    src={item.product?.image || 'https://via.placeholder.com/100x100?text=No+Image'}
+                    src={item.product?.thumbnail || item.product?.image || 'https://via.placeholder.com/100x100?text=No+Image'}
                     alt={item.product?.name}
                     className="w-20 h-20 object-cover rounded-lg mr-4"
                     onError={(e) => {
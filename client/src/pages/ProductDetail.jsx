@@ -99,7 +99,7 @@ const ProductDetail = () => {
     );
   }
 
-  const mainImageUrl = product.image || 'https://via.placeholder.com/600x400?text=No+Image';
+  const mainImageUrl = product.thumbnail || product.image || 'https://via.placeholder.com/600x400?text=No+Image';
 
   return (
     <div className="min-h-screen bg-gray-50 py-8">
@@ -317,7 +317,7 @@ const ProductDetail = () => {
                   onClick={() => navigate(`/products/${relatedProduct.id}`)}
                 >
                   <img
-                    src={relatedProduct.image || 'https://via.placeholder.com/300x200?text=No+Image'}
+                    src={relatedProduct.thumbnail || relatedProduct.image || 'https://via.placeholder.com/300x200?text=No+Image'}
                     alt={relatedProduct.name}
                     className="w-full h-48 object-cover"
                     onError={(e) => {
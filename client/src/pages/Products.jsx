@@ -11,36 +11,27 @@ const Products = () => {
   const [filteredProducts, setFilteredProducts] = useState([]);
 
   useEffect(() => {
-    fetchProducts();
-    fetchCategories();
+    fetchPage();
   }, []);
 
   useEffect(() => {
     filterProducts();
   }, [products, searchTerm, selectedCategory]);
 
-  const fetchProducts = async () => {
+  const fetchPage = async () => {
     try {
-      const response = await publicApi.get('/products');
-      setProducts(response.data.products);
+      const response = await publicApi.get('/pages/home');
+      setProducts(response.data.products.products);
+      setCategories(response.data.categories);
     } catch (error) {
       console.error('Error fetching products:', error);
       setProducts([]); // Set empty array on error
+      setCategories([]);
     } finally {
       setLoading(false);
     }
   };
 
-  const fetchCategories = async () => {
-    try {
-      const response = await publicApi.get('/categories');
-      setCategories(response.data.categories);
-    } catch (error) {
-      console.error('Error fetching categories:', error);
-      setCategories([]); // Set empty array on error
-    }
-  };
-
   const filterProducts = () => {
     let filtered = products;
 
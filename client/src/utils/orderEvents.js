@@ -0,0 +1,55 @@
+import api from './api';
+
+const RECONNECT_DELAY_MS = 5000;
+
+// Follow /admin/orders/stream from `lastEventId`, calling onEvent(event) for
+// each new order ("created") or status change ("status_changed"). Every
+// connection uses a fresh short-lived ticket, since EventSource cannot send
+// the Authorization header. Returns a function that stops the stream.
+export const subscribeToOrderEvents = (lastEventId, onEvent) => {
+  let source = null;
+  let timer = null;
+  let stopped = false;
+  let lastId = lastEventId;
+
+  const handle = (message) => {
+    lastId = message.lastEventId || lastId;
+    onEvent(JSON.parse(message.data));
+  };
+
+  const reconnect = () => {
+    if (source) {
+      source.close();
+      source = null;
+    }
+    if (!stopped) {
+      timer = setTimeout(connect, RECONNECT_DELAY_MS);
+    }
+  };
+
+  const connect = async () => {
+    try {
+      const response = await api.post('/admin/orders/stream-ticket');
+      if (stopped) return;
+      const params = new URLSearchParams({ ticket: response.data.ticket });
+      if (lastId != null) params.set('last_event_id', lastId);
+      source = new EventSource(`${api.defaults.baseURL}/admin/orders/stream?${params}`);
+      source.addEventListener('created', handle);
+      source.addEventListener('status_changed', handle);
+      // The server ends each stream after a few minutes, and the ticket
+      // has expired by then, so reconnect ourselves with a new one.
+      source.onerror = reconnect;
+    } catch (error) {
+      console.error('Error opening order stream:', error);
+      reconnect();
+    }
+  };
+
+  connect();
+
+  return () => {
+    stopped = true;
+    clearTimeout(timer);
+    if (source) source.close();
+  };
+};